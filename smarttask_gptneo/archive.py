@@ -0,0 +1,124 @@
+import os
+import gzip
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from file_lock import FileLock
+from task_model import parse_task_date
+
+# Segment for tasks whose date is missing or unparseable
+UNDATED_SEGMENT = "undated"
+
+
+class TaskArchive:
+    """Append-only, compressed archive of expired tasks.
+
+    Tasks are partitioned by the month of their date into segment files
+    (``2025-01.jsonl.gz``), each a series of gzip members holding one JSON
+    task per line. Archiving appends a new member, so existing data is
+    never rewritten. Queries stream only the segments overlapping the
+    requested range, one line at a time, so history never has to be loaded
+    into memory.
+    """
+
+    def __init__(self, directory: str = "tasks_archive"):
+        """Use (and if needed create) the archive directory."""
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = FileLock(os.path.join(directory, ".lock"))
+
+    def _segment_path(self, segment: str) -> str:
+        return os.path.join(self.directory, f"{segment}.jsonl.gz")
+
+    @staticmethod
+    def _segment_for(task: Dict[str, Any]) -> str:
+        task_date = parse_task_date(task.get('date'))
+        return task_date.strftime('%Y-%m') if task_date else UNDATED_SEGMENT
+
+    def segments(self) -> List[str]:
+        """Return the names of the existing segments, oldest first."""
+        names = [name[:-len(".jsonl.gz")] for name in os.listdir(self.directory)
+                 if name.endswith(".jsonl.gz")]
+        return sorted(names)
+
+    def append(self, tasks: List[Dict[str, Any]]) -> int:
+        """
+        Append tasks to their segments.
+
+        Args:
+            tasks: Tasks to archive
+
+        Returns:
+            Number of tasks archived
+        """
+        if not tasks:
+            return 0
+        archived_at = datetime.now().isoformat()
+        by_segment: Dict[str, List[str]] = {}
+        for task in tasks:
+            record = dict(task, archived_at=archived_at)
+            by_segment.setdefault(self._segment_for(task), []).append(json.dumps(record))
+
+        # One gzip member per segment per call; readers see whole members only
+        with self._lock:
+            for segment, lines in by_segment.items():
+                with open(self._segment_path(segment), "ab") as f:
+                    f.write(gzip.compress(("\n".join(lines) + "\n").encode("utf-8")))
+                    f.flush()
+                    os.fsync(f.fileno())
+        return len(tasks)
+
+    def query(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              criteria: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield archived tasks with start <= date < end matching the criteria.
+
+        Segments outside the date range are skipped without being opened.
+        Undated tasks are only included when no range is given. A task
+        archived twice (e.g. after an interrupted cleanup) is yielded once.
+        Duplicates share a segment, so they are tracked per segment and
+        memory stays bounded by its size rather than the whole history.
+
+        Args:
+            start: Earliest task date, or None for no lower bound
+            end: Latest task date (exclusive), or None for no upper bound
+            criteria: Field values the tasks must have
+
+        Returns:
+            Iterator over task dictionaries, by segment month
+        """
+        first = start.strftime('%Y-%m') if start else None
+        last = end.strftime('%Y-%m') if end else None
+        for segment in self.segments():
+            if segment == UNDATED_SEGMENT:
+                if start or end:
+                    continue
+            elif (first and segment < first) or (last and segment > last):
+                continue
+
+            seen = set()
+            for task in self._read_segment(segment):
+                if start or end:
+                    task_date = parse_task_date(task.get('date'))
+                    if (start and task_date < start) or (end and task_date >= end):
+                        continue
+                if criteria and not all(field in task and task[field] == value
+                                        for field, value in criteria.items()):
+                    continue
+                if 'id' in task:
+                    if task['id'] in seen:
+                        continue
+                    seen.add(task['id'])
+                yield task
+
+    def _read_segment(self, segment: str) -> Iterator[Dict[str, Any]]:
+        """Stream the tasks in a segment, stopping at a truncated trailing member."""
+        try:
+            with gzip.open(self._segment_path(segment), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, OSError, ValueError) as e:
+            logging.warning(f"Archive segment {segment} is damaged after this point: {str(e)}")
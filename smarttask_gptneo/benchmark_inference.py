@@ -0,0 +1,190 @@
+"""Benchmark CPU inference variants of the primary model.
+
+Measures load time, resident memory, single-request latency and tokens/s
+(unbatched and batched) for each variant, and checks that every variant
+parses a fixed prompt set the same way as fp32. Each variant runs in its
+own subprocess so memory figures don't include the other variants.
+
+The onnx variant needs optimum[onnxruntime]; its first run includes the
+one-off ONNX export in the load time. A variant that fails to load is
+reported and skipped.
+
+Usage:
+    python benchmark_inference.py [--variants fp32,int8,onnx] [--runs 3] [--batch-size 8]
+                                  [--intra-op 4] [--inter-op 1] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+# Variant name -> (backend, quantization mode) passed to llm_agent.create_generator
+VARIANTS = {
+    "fp32": ("pytorch", "none"),
+    "int8": ("pytorch", "int8"),
+    "onnx": ("onnx", "none"),
+}
+
+# Fixed prompt set for timing and for comparing parse results between variants
+BENCHMARK_PROMPTS = [
+    "remind me to take out the trash tomorrow",
+    "schedule a meeting with Sarah next monday at 10am",
+    "pay the rent on the 1st, high priority",
+    "book a dentist appointment next week",
+    "call the bank about my credit card, very important",
+    "buy groceries after work",
+    "finish the quarterly report by friday",
+    "remind me to water the plants every sunday",
+    "dinner with the team on thursday at 7pm",
+    "study for the math exam, not urgent",
+]
+
+PARSE_FIELDS = ("type", "priority", "category", "description")
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process, in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: fall back to the peak RSS (KB on Linux, bytes on macOS)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_variant(variant: str, runs: int, batch_size: int) -> Dict[str, Any]:
+    """Load one variant in this process and measure it."""
+    import llm_agent
+
+    llm_agent.configure_torch_threads()
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    backend, quantize = VARIANTS[variant]
+    generator = llm_agent.create_generator(quantize, backend)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    def count_tokens(texts: List[str]) -> int:
+        return sum(len(generator.tokenizer(text, add_special_tokens=False)["input_ids"]) for text in texts)
+
+    llm_agent._generate_batch(llm_agent.WARMUP_REQUESTS, generator)
+
+    # One request at a time, as a lone user would see it
+    latencies, tokens, outputs = [], 0, []
+    for run in range(runs):
+        for prompt in BENCHMARK_PROMPTS:
+            started = time.perf_counter()
+            output = llm_agent._generate_batch([prompt], generator)[0]
+            latencies.append(time.perf_counter() - started)
+            tokens += count_tokens([output])
+            if run == 0:
+                outputs.append(output)
+
+    # Padded batches, as the batching queue runs them under load
+    batched_seconds, batched_tokens = 0.0, 0
+    for _ in range(runs):
+        for i in range(0, len(BENCHMARK_PROMPTS), batch_size):
+            chunk = BENCHMARK_PROMPTS[i:i + batch_size]
+            started = time.perf_counter()
+            chunk_outputs = llm_agent._generate_batch(chunk, generator)
+            batched_seconds += time.perf_counter() - started
+            batched_tokens += count_tokens(chunk_outputs)
+
+    return {
+        "variant": variant,
+        "load_seconds": round(load_seconds, 2),
+        "model_rss_mb": round(rss_loaded - rss_before, 1),
+        "rss_mb": round(_rss_mb(), 1),
+        "latency_ms_mean": round(statistics.mean(latencies) * 1000, 1),
+        "latency_ms_p50": round(_percentile(latencies, 0.5) * 1000, 1),
+        "latency_ms_p95": round(_percentile(latencies, 0.95) * 1000, 1),
+        "tokens_per_second": round(tokens / sum(latencies), 1),
+        "batched_tokens_per_second": round(batched_tokens / batched_seconds, 1),
+        "parses": [llm_agent.parse_model_output(output) for output in outputs],
+    }
+
+
+def compare_parses(baseline: List[Dict[str, Any]], other: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Share of prompts (and of each field) parsed identically to the baseline."""
+    agreement = {"all_fields": sum(a == b for a, b in zip(baseline, other)) / len(baseline)}
+    for field in PARSE_FIELDS:
+        agreement[field] = sum(a.get(field) == b.get(field) for a, b in zip(baseline, other)) / len(baseline)
+    return {name: round(value, 3) for name, value in agreement.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", default=",".join(VARIANTS),
+                        help=f"comma-separated variants to compare (first is the baseline): {', '.join(VARIANTS)}")
+    parser.add_argument("--runs", type=int, default=3, help="passes over the prompt set per measurement")
+    parser.add_argument("--batch-size", type=int, default=8, help="batch size for the batched throughput pass")
+    parser.add_argument("--intra-op", type=int, help="torch intra-op threads (TORCH_INTRA_OP_THREADS)")
+    parser.add_argument("--inter-op", type=int, help="torch inter-op threads (TORCH_INTER_OP_THREADS)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_variant(args.child, args.runs, args.batch_size)))
+        return
+
+    variants = [name.strip() for name in args.variants.split(",") if name.strip()]
+    unknown = [name for name in variants if name not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variants: {', '.join(unknown)}")
+
+    env = dict(os.environ)
+    if args.intra_op is not None:
+        env["TORCH_INTRA_OP_THREADS"] = str(args.intra_op)
+    if args.inter_op is not None:
+        env["TORCH_INTER_OP_THREADS"] = str(args.inter_op)
+
+    results = []
+    for variant in variants:
+        print(f"Benchmarking {variant}...", file=sys.stderr)
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", variant,
+             "--runs", str(args.runs), "--batch-size", str(args.batch_size)],
+            env=env, stdout=subprocess.PIPE, text=True)
+        if completed.returncode != 0:
+            print(f"Skipping {variant}: benchmark exited with status {completed.returncode}", file=sys.stderr)
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    if not results:
+        sys.exit("No variant could be benchmarked")
+
+    baseline = results[0]
+    for result in results[1:]:
+        result["agreement_with_" + baseline["variant"]] = compare_parses(baseline["parses"], result["parses"])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    columns = ("variant", "load_seconds", "model_rss_mb", "rss_mb", "latency_ms_mean", "latency_ms_p50",
+               "latency_ms_p95", "tokens_per_second", "batched_tokens_per_second")
+    print("  ".join(f"{column:>14}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>14}" for column in columns))
+    for result in results[1:]:
+        agreement = result["agreement_with_" + baseline["variant"]]
+        fields = ", ".join(f"{name} {value:.0%}" for name, value in agreement.items())
+        print(f"\n{result['variant']} parses agree with {baseline['variant']}: {fields}")
+
+
+if __name__ == "__main__":
+    main()
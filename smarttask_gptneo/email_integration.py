@@ -16,6 +16,13 @@ EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'true').lower() == 'true'
 EMAIL_USERNAME = os.environ.get('EMAIL_USERNAME', '')
 EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD', '')
 
+class InboxScanError(Exception):
+    """Scanning the inbox failed part way; ``tasks`` holds the tasks found before the failure."""
+    
+    def __init__(self, message: str, tasks: List[Dict[str, Any]]):
+        super().__init__(message)
+        self.tasks = tasks
+
 def format_date_for_display(date_str: str) -> str:
     """Format ISO date string for display in emails."""
     try:
@@ -24,12 +31,63 @@ def format_date_for_display(date_str: str) -> str:
     except:
         return date_str
 
-def send_email_reminder(task_data: Dict[str, Any]) -> bool:
+def get_reminder_recipient(task_data: Dict[str, Any]) -> str:
+    """Return the address a task's reminder goes to."""
+    if 'participants' in task_data and task_data['participants']:
+        # Use first participant as recipient if it looks like an email
+        recipient = task_data['participants'][0]
+        if '@' not in recipient:
+            recipient = EMAIL_USERNAME  # Fallback to self if not an email
+    else:
+        recipient = EMAIL_USERNAME  # Send to self if no participants
+    return recipient
+
+def open_smtp_session() -> smtplib.SMTP:
+    """Connect and log in to the SMTP server; use as a context manager to close it."""
+    server = smtplib.SMTP(EMAIL_HOST, EMAIL_PORT)
+    try:
+        if EMAIL_USE_TLS:
+            server.starttls()
+        server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def _send_message(msg: MIMEMultipart, server: Optional[smtplib.SMTP] = None):
+    """Send a message over the given SMTP session, or a new one."""
+    if server is not None:
+        server.send_message(msg)
+        return
+    with open_smtp_session() as server:
+        server.send_message(msg)
+
+def _reminder_details_html(task_data: Dict[str, Any]) -> str:
+    """HTML block describing one task in a reminder."""
+    details = f"""
+            <p><strong>Task:</strong> {task_data['description']}</p>
+            <p><strong>Date:</strong> {format_date_for_display(task_data['date'])}</p>
+            <p><strong>Priority:</strong> {task_data['priority'].capitalize()}</p>
+            <p><strong>Category:</strong> {task_data['category'].capitalize()}</p>
+        """
+    
+    # Add location if available
+    if task_data.get('location'):
+        details += f"<p><strong>Location:</strong> {task_data['location']}</p>"
+        
+    # Add participants if available
+    if task_data.get('participants') and len(task_data['participants']) > 1:
+        participants_str = ", ".join(task_data['participants'][1:])  # Skip first one (recipient)
+        details += f"<p><strong>Participants:</strong> {participants_str}</p>"
+    return details
+
+def send_email_reminder(task_data: Dict[str, Any], server: Optional[smtplib.SMTP] = None) -> bool:
     """
     Send an email reminder for a task.
     
     Args:
         task_data: Task details including description, date, etc.
+        server: Open SMTP session to reuse (see open_smtp_session)
         
     Returns:
         Boolean indicating success
@@ -42,17 +100,7 @@ def send_email_reminder(task_data: Dict[str, Any]) -> bool:
         # Create message
         msg = MIMEMultipart()
         msg['From'] = EMAIL_USERNAME
-        
-        # Set recipient
-        if 'participants' in task_data and task_data['participants']:
-            # Use first participant as recipient if it looks like an email
-            recipient = task_data['participants'][0]
-            if '@' not in recipient:
-                recipient = EMAIL_USERNAME  # Fallback to self if not an email
-        else:
-            recipient = EMAIL_USERNAME  # Send to self if no participants
-            
-        msg['To'] = recipient
+        msg['To'] = get_reminder_recipient(task_data)
         msg['Subject'] = f"Reminder: {task_data['description']}"
         msg['Date'] = formatdate(localtime=True)
         
@@ -61,43 +109,100 @@ def send_email_reminder(task_data: Dict[str, Any]) -> bool:
         <html>
         <body>
             <h2>Task Reminder</h2>
-            <p><strong>Task:</strong> {task_data['description']}</p>
-            <p><strong>Date:</strong> {format_date_for_display(task_data['date'])}</p>
-            <p><strong>Priority:</strong> {task_data['priority'].capitalize()}</p>
-            <p><strong>Category:</strong> {task_data['category'].capitalize()}</p>
+            {_reminder_details_html(task_data)}
+        <p>This is an automated reminder from your SmartTask Assistant.</p>
+        </body>
+        </html>
         """
         
-        # Add location if available
-        if task_data.get('location'):
-            email_body += f"<p><strong>Location:</strong> {task_data['location']}</p>"
-            
-        # Add participants if available
-        if task_data.get('participants') and len(task_data['participants']) > 1:
-            participants_str = ", ".join(task_data['participants'][1:])  # Skip first one (recipient)
-            email_body += f"<p><strong>Participants:</strong> {participants_str}</p>"
+        # Attach body and send
+        msg.attach(MIMEText(email_body, 'html'))
+        _send_message(msg, server)
             
-        # Close the HTML
-        email_body += """
+        return True
+        
+    except Exception as e:
+        print(f"Failed to send email: {str(e)}")
+        return False
+
+def send_email_digest(recipient: str, tasks: List[Dict[str, Any]],
+                      server: Optional[smtplib.SMTP] = None) -> bool:
+    """
+    Send one email reminding a recipient of several tasks.
+    
+    Args:
+        recipient: Email address to send to
+        tasks: Tasks to remind about, in the order to list them
+        server: Open SMTP session to reuse (see open_smtp_session)
+        
+    Returns:
+        Boolean indicating success
+    """
+    if not EMAIL_USERNAME or not EMAIL_PASSWORD:
+        print("Email credentials not configured")
+        return False
+    
+    try:
+        msg = MIMEMultipart()
+        msg['From'] = EMAIL_USERNAME
+        msg['To'] = recipient
+        msg['Subject'] = f"Reminder: {len(tasks)} upcoming tasks"
+        msg['Date'] = formatdate(localtime=True)
+        
+        sections = "<hr>".join(_reminder_details_html(task) for task in tasks)
+        email_body = f"""
+        <html>
+        <body>
+            <h2>Upcoming Tasks</h2>
+            {sections}
         <p>This is an automated reminder from your SmartTask Assistant.</p>
         </body>
         </html>
         """
         
-        # Attach body and send
         msg.attach(MIMEText(email_body, 'html'))
+        _send_message(msg, server)
         
-        with smtplib.SMTP(EMAIL_HOST, EMAIL_PORT) as server:
-            if EMAIL_USE_TLS:
-                server.starttls()
-            server.login(EMAIL_USERNAME, EMAIL_PASSWORD)
-            server.send_message(msg)
-            
         return True
         
     except Exception as e:
         print(f"Failed to send email: {str(e)}")
         return False
 
+def send_reminder_batch(tasks: List[Dict[str, Any]]) -> List[bool]:
+    """
+    Send reminders for several tasks over a single SMTP session.
+    
+    Tasks for the same recipient are merged into one digest email.
+    
+    Args:
+        tasks: Tasks to remind about
+        
+    Returns:
+        List of booleans indicating success for each task, in order
+    """
+    if not EMAIL_USERNAME or not EMAIL_PASSWORD:
+        print("Email credentials not configured")
+        return [False] * len(tasks)
+    
+    by_recipient = {}
+    for index, task in enumerate(tasks):
+        by_recipient.setdefault(get_reminder_recipient(task), []).append(index)
+    
+    results = [False] * len(tasks)
+    try:
+        with open_smtp_session() as server:
+            for recipient, indexes in by_recipient.items():
+                if len(indexes) == 1:
+                    sent = send_email_reminder(tasks[indexes[0]], server)
+                else:
+                    sent = send_email_digest(recipient, [tasks[i] for i in indexes], server)
+                for i in indexes:
+                    results[i] = sent
+    except Exception as e:
+        print(f"Failed to send email: {str(e)}")
+    return results
+
 def scan_inbox_for_tasks() -> List[Dict[str, Any]]:
     """
     Scan email inbox for messages that might contain tasks.
@@ -167,6 +272,7 @@ def scan_inbox_for_tasks() -> List[Dict[str, Any]]:
         
     except Exception as e:
         print(f"Failed to scan inbox: {str(e)}")
+        raise InboxScanError(str(e), tasks) from e
         
     return tasks
 
@@ -193,7 +193,7 @@ def get_upcoming_events(days: int = 7) -> List[Dict[str, Any]]:
         
     except Exception as e:
         print(f"Failed to retrieve calendar events: {str(e)}")
-        return []
+        raise
 
 def delete_calendar_event(event_id: str) -> bool:
     """
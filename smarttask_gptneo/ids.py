@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+# Crockford's base32: no I, L, O or U, so IDs are unambiguous when read aloud
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: value for value, char in enumerate(_ALPHABET)}
+
+TIME_LENGTH = 10
+RANDOM_LENGTH = 16
+ID_LENGTH = TIME_LENGTH + RANDOM_LENGTH
+
+_RANDOM_BITS = RANDOM_LENGTH * 5
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(_ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class TaskIdGenerator:
+    """Generates ULID-style task IDs.
+
+    An ID is 26 characters: a 48-bit millisecond timestamp followed by 80
+    random bits, both in Crockford base32, so IDs sort lexicographically by
+    creation time. Within the same millisecond (or if the clock steps back)
+    the random part of the previous ID is incremented instead of redrawn,
+    so IDs from one generator are strictly increasing and never collide.
+    """
+
+    def __init__(self):
+        """Create a generator with no previous ID."""
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self) -> str:
+        """Return a new ID, greater than any previously returned one."""
+        with self._lock:
+            now_ms = int(time.time() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            elif self._last_random < _RANDOM_MAX:
+                self._last_random += 1
+            else:
+                # Random part exhausted within one millisecond; borrow the next one
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            return _encode(self._last_ms, TIME_LENGTH) + _encode(self._last_random, RANDOM_LENGTH)
+
+
+_generator = TaskIdGenerator()
+
+
+def new_task_id() -> str:
+    """Return a new time-sortable task ID from the process-wide generator."""
+    return _generator.new_id()
+
+
+def is_sortable_id(task_id) -> bool:
+    """Return True if task_id was made by TaskIdGenerator."""
+    return (isinstance(task_id, str) and len(task_id) == ID_LENGTH
+            and task_id[0] <= '7' and all(char in _DECODE for char in task_id))
+
+
+def id_timestamp(task_id) -> Optional[float]:
+    """Return the creation time encoded in a sortable ID (Unix seconds), or None."""
+    if not is_sortable_id(task_id):
+        return None
+    value = 0
+    for char in task_id[:TIME_LENGTH]:
+        value = value * 32 + _DECODE[char]
+    return value / 1000
+
+
+def id_floor(moment: datetime) -> str:
+    """Return the smallest sortable ID that could have been created at ``moment``."""
+    return _encode(int(moment.timestamp() * 1000), TIME_LENGTH) + "0" * RANDOM_LENGTH
@@ -0,0 +1,136 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, List, Optional
+
+from metrics import LLM_BATCH_SIZE, LLM_ERRORS, LLM_INFERENCE_DURATION, LLM_QUEUE_WAIT
+
+
+class BatchingQueue:
+    """In-process request queue that runs concurrent requests as one batch.
+
+    Callers submit single items from any thread. A worker thread takes the
+    first waiting item, then keeps collecting until ``max_batch_size``
+    items are gathered or ``max_wait`` seconds have passed since the first
+    one, and hands the whole batch to ``run_batch``. Under load batches
+    fill up immediately; a lone request waits at most ``max_wait``.
+    Requests whose caller gave up (cancelled future) are dropped before
+    the batch runs.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait: float = 0.02, name: str = "batch"):
+        """
+        Args:
+            run_batch: Called with a list of items; returns one result per item, in order
+            max_batch_size: Most items per batch
+            max_wait: Longest time to hold a batch open for more items, in seconds
+            name: Name used for the worker thread and in metrics
+        """
+        self._run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread if it isn't running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stop the worker once the requests already queued are served."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item and return a future for its result."""
+        future: Future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        self.start()
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run one item through the queue and wait for its result.
+
+        Args:
+            item: Item to process
+            timeout: Longest time to wait, in seconds; None waits forever
+
+        Returns:
+            The item's result from run_batch
+        """
+        future = self.submit(item)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def qsize(self) -> int:
+        """Return the number of items waiting for a batch."""
+        return self._queue.qsize()
+
+    def _collect(self, first) -> list:
+        """Gather a batch starting with ``first``; returns None in the batch on stop."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(entry)
+            if entry is None:
+                break
+        return batch
+
+    def _worker(self):
+        """Serve batches until stopped."""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+
+            # set_running_or_notify_cancel() is False for requests cancelled meanwhile
+            batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+            if batch:
+                self._run(batch)
+            if stopping:
+                return
+
+    def _run(self, batch: list):
+        """Run one batch and resolve its futures."""
+        started = time.monotonic()
+        for _, _, queued_at in batch:
+            LLM_QUEUE_WAIT.observe(started - queued_at, queue=self.name)
+        LLM_BATCH_SIZE.observe(len(batch), queue=self.name)
+        try:
+            results = self._run_batch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            LLM_ERRORS.inc(queue=self.name)
+            logging.warning(f"Batch of {len(batch)} in {self.name} failed: {str(e)}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        finally:
+            LLM_INFERENCE_DURATION.observe(time.monotonic() - started, queue=self.name)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,138 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from metrics import JOB_DURATION, JOB_ERRORS, JOB_SKIPPED, JOB_TIMEOUTS, JOBS_RUNNING
+
+
+class Job:
+    """A named background job with its own worker pool."""
+
+    def __init__(self, name: str, func: Callable[[], Any], timeout: float, workers: int = 1):
+        self.name = name
+        self.func = func
+        self.timeout = timeout
+        self.workers = workers
+        self.pool: Optional[ThreadPoolExecutor] = None
+        self.future: Optional[Future] = None
+        self.started = 0.0
+        self.timed_out = False
+        self.timeouts = 0
+
+
+class JobExecutor:
+    """Runs scheduler jobs in isolated worker pools.
+
+    Each job gets its own pool, so a hung IMAP scan can't delay calendar
+    sync or reminders. A job never overlaps with itself: submitting it
+    while a run is in progress is skipped. A run that exceeds its
+    wall-clock timeout is logged and counted, but Python threads can't be
+    killed, so it keeps counting as in progress and further runs are
+    skipped until it actually returns. Starting a second run next to a
+    stuck one would let e.g. two email imports turn the same messages
+    into duplicate tasks.
+
+    Pools exist between start() and shutdown(); an executor can be
+    started again after a shutdown, e.g. when this process is re-elected
+    scheduler leader.
+    """
+
+    def __init__(self):
+        """Create an executor with no jobs."""
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        JOBS_RUNNING.set_function(lambda: len(self.running()))
+
+    def register(self, name: str, func: Callable[[], Any], timeout: float, workers: int = 1):
+        """
+        Register a job.
+
+        Args:
+            name: Unique job name
+            func: Callable run for each execution
+            timeout: Wall-clock limit for one run, in seconds
+            workers: Size of the job's worker pool
+        """
+        with self._lock:
+            self._jobs[name] = Job(name, func, timeout, workers)
+
+    def start(self):
+        """Create fresh worker pools for all jobs so runs can be submitted."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.pool is None:
+                    job.pool = ThreadPoolExecutor(max_workers=job.workers, thread_name_prefix=f"job-{job.name}")
+
+    def submit(self, name: str) -> bool:
+        """
+        Start a run of the job unless one is already in progress.
+
+        Args:
+            name: Name of a registered job
+
+        Returns:
+            Boolean indicating whether a run was started
+        """
+        with self._lock:
+            job = self._jobs[name]
+            if job.pool is None:
+                logging.info(f"Job executor is not started; skipping job {name}")
+                return False
+            self._check_timeout(job)
+            if job.future is not None and not job.future.done():
+                logging.info(f"Job {name} is still running; skipping this run")
+                JOB_SKIPPED.inc(job=name)
+                return False
+            job.started = time.monotonic()
+            job.timed_out = False
+            job.future = job.pool.submit(self._run, job)
+            return True
+
+    def check_timeouts(self):
+        """Log and count runs that exceeded their timeout."""
+        with self._lock:
+            for job in self._jobs.values():
+                self._check_timeout(job)
+
+    def running(self) -> Dict[str, float]:
+        """Return the elapsed seconds of each job run in progress, by job name."""
+        now = time.monotonic()
+        with self._lock:
+            return {job.name: now - job.started for job in self._jobs.values()
+                    if job.future is not None and not job.future.done()}
+
+    def shutdown(self):
+        """Stop accepting runs; runs in progress finish in the background."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.pool is not None:
+                    # A run still in progress keeps its future, so a restarted
+                    # executor won't start the job next to it
+                    job.pool.shutdown(wait=False)
+                    job.pool = None
+
+    def _check_timeout(self, job: Job):
+        """Flag the job's current run if it is over time; caller holds the lock."""
+        if job.future is None or job.future.done() or job.timed_out:
+            return
+        elapsed = time.monotonic() - job.started
+        if elapsed <= job.timeout:
+            return
+        logging.warning(f"Job {job.name} timed out after {elapsed:.0f}s; "
+                        f"skipping its runs until it returns")
+        job.timed_out = True
+        job.timeouts += 1
+        JOB_TIMEOUTS.inc(job=job.name)
+
+    def _run(self, job: Job):
+        """Run one execution of a job, logging any error."""
+        started = time.monotonic()
+        try:
+            return job.func()
+        except Exception as e:
+            JOB_ERRORS.inc(job=job.name)
+            logging.warning(f"Error in job {job.name}: {str(e)}")
+        finally:
+            JOB_DURATION.observe(time.monotonic() - started, job=job.name)
@@ -0,0 +1,85 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+from file_lock import FileLock
+
+# How often a standby process tries to take over the lease, in seconds
+LEASE_POLL_SECONDS = 2.0
+
+
+class LeaderLease:
+    """Elects one process as leader through an exclusive lock file.
+
+    Every process runs a small lease thread that tries to take the lock
+    without blocking. The holder is the leader until it stops or dies; the
+    OS drops the lock of a dead process, so a standby takes over within
+    ``poll_interval`` seconds.
+    """
+
+    def __init__(self, lock_file: str, on_elected: Callable[[], None],
+                 on_resigned: Optional[Callable[[], None]] = None,
+                 poll_interval: float = LEASE_POLL_SECONDS):
+        """
+        Create the lease; call start() to begin competing for it.
+
+        Args:
+            lock_file: Path of the lock file shared by all processes
+            on_elected: Called (on the lease thread) when this process becomes leader
+            on_resigned: Called when this process gives up leadership in stop(),
+                or after on_elected raised (the lease is then retried after poll_interval)
+            poll_interval: Seconds between takeover attempts
+        """
+        self.lock = FileLock(lock_file)
+        self.on_elected = on_elected
+        self.on_resigned = on_resigned
+        self.poll_interval = poll_interval
+        self.is_leader = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start competing for leadership in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="leader-lease", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Stop competing and release leadership if held."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        """Try to take the lease until elected, then hold it until stopped."""
+        # The lock is reentrant per thread, so acquire and release both
+        # happen on this thread
+        while not self._stop.is_set():
+            try:
+                acquired = self.lock.acquire(blocking=False)
+            except OSError as e:
+                logging.warning(f"Error acquiring leader lease: {str(e)}")
+                acquired = False
+            if acquired:
+                self._lead()
+            self._stop.wait(self.poll_interval)
+
+    def _lead(self):
+        """Run as leader until stopped; if taking over fails, resign and let the caller retry."""
+        self.is_leader = True
+        try:
+            self.on_elected()
+            self._stop.wait()
+        except Exception as e:
+            logging.warning(f"Error taking over as leader: {str(e)}")
+        finally:
+            self.is_leader = False
+            try:
+                if self.on_resigned:
+                    self.on_resigned()
+            except Exception as e:
+                logging.warning(f"Error resigning as leader: {str(e)}")
+            finally:
+                self.lock.release()
@@ -1,4 +1,5 @@
 from transformers import pipeline
+import torch
 import re
 import os
 import json
@@ -9,26 +10,266 @@ import dateparser
 from dateparser.search import search_dates
 from datetime import datetime, timedelta
 import parsedatetime
+import threading
+import time
+
+from file_lock import FileLock
+from inference import BatchingQueue
+from metrics import LLM_CACHE_HITS, LLM_CACHE_MISSES, LLM_CACHE_SIZE
+from ttl_cache import TTLCache
 
 DEFAULT_MODEL = "EleutherAI/gpt-neo-125M"  # Smaller model for better performance
 OPENAI_FALLBACK = os.environ.get("USE_OPENAI", "false").lower() == "true"
 
+# Concurrent interpretation requests are run through the model in batches
+# of up to LLM_MAX_BATCH_SIZE, held open for at most LLM_MAX_WAIT_MS
+LLM_MAX_BATCH_SIZE = int(os.environ.get("LLM_MAX_BATCH_SIZE", "8"))
+LLM_MAX_WAIT_MS = float(os.environ.get("LLM_MAX_WAIT_MS", "20"))
+# Longest a request waits for the model before using the rule-based parser
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_NEW_TOKENS = 40
+# Interpretations of recent request texts are memoized (LRU with a TTL)
+LLM_CACHE_SIZE_LIMIT = int(os.environ.get("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.environ.get("LLM_CACHE_TTL_SECONDS", "3600"))
+# Load the primary model in the background at startup ("false" keeps the rule-based parser only)
+LLM_PRELOAD = os.environ.get("LLM_PRELOAD", "true").lower() == "true"
+
+# "int8" runs the model with dynamically quantized (int8) linear layers,
+# which is smaller and faster on CPU; "none" keeps fp32
+LLM_QUANTIZE = os.environ.get("LLM_QUANTIZE", "none").lower()
+# Torch intra-op (per-operator) and inter-op thread pools; 0 keeps torch's default
+TORCH_INTRA_OP_THREADS = int(os.environ.get("TORCH_INTRA_OP_THREADS", "0"))
+TORCH_INTER_OP_THREADS = int(os.environ.get("TORCH_INTER_OP_THREADS", "0"))
+
+QUANTIZATION_MODES = ("none", "int8")
+
+# Inference backend: "pytorch" (eager transformers) or "onnx" (ONNX Runtime
+# on CPU via optimum; the model is exported once and cached in LLM_ONNX_CACHE)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "pytorch").lower()
+LLM_ONNX_CACHE = os.environ.get("LLM_ONNX_CACHE", "model_cache/onnx")
+
+BACKENDS = ("pytorch", "onnx")
+
+# Model lifecycle: not_loaded -> loading -> warming_up -> ready, or failed
+MODEL_NOT_LOADED = "not_loaded"
+MODEL_LOADING = "loading"
+MODEL_WARMING_UP = "warming_up"
+MODEL_READY = "ready"
+MODEL_FAILED = "failed"
+
+# Run once before the model serves requests, so lazy kernel and allocator
+# setup (and the padded batch path) isn't paid by the first user
+WARMUP_REQUESTS = [
+    "remind me to call mom tomorrow at 5pm",
+    "schedule a team meeting next monday, high priority",
+]
+
+TASK_TYPES = ("task", "remind", "event")
+PRIORITIES = ("high", "medium", "low")
+CATEGORIES = ("work", "personal", "health", "finance", "education", "shopping", "social", "other")
+
+# Few-shot prompt: the model continues the last "Task:" line
+INTERPRET_PROMPT = """Convert each request into a task.
+
+Request: remind me to call mom tomorrow at 5pm
+Task: type=remind; priority=medium; category=personal; description=call mom
+
+Request: schedule a meeting with the design team on friday, very important
+Task: type=event; priority=high; category=work; description=meeting with the design team
+
+Request: pay the electricity bill next week, not urgent
+Task: type=task; priority=low; category=finance; description=pay the electricity bill
+
+Request: {request}
+Task:"""
+
 # Initialize generators as None
 primary_generator = None
 fallback_generator = None
 
-def load_primary_model():
-    """Load the primary Hugging Face model."""
+# Current state of the primary model, reported by /health/ready
+model_status = {"state": MODEL_NOT_LOADED, "model": DEFAULT_MODEL, "backend": LLM_BACKEND,
+                "quantization": LLM_QUANTIZE, "error": None, "load_seconds": None, "warmup_seconds": None}
+_preload_lock = threading.Lock()
+_preload_thread = None
+
+def configure_torch_threads(intra_op: int = TORCH_INTRA_OP_THREADS, inter_op: int = TORCH_INTER_OP_THREADS):
+    """Size torch's CPU thread pools; 0 leaves a pool at torch's default."""
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Only allowed before torch runs any parallel work
+            print(f"[LLM] Could not set inter-op threads: {str(e)}")
+
+def _load_onnx_model():
+    """
+    Load the ONNX export of the primary model, exporting it on first use.
+
+    The export includes the past key/value inputs and outputs, so each
+    decode step reuses the attention cache instead of re-running the
+    whole prefix. Exports are written to a temporary directory and
+    renamed into place under a lock, so concurrent workers export once
+    and never see a partial export.
+
+    Returns:
+        Tuple of (ORTModelForCausalLM, tokenizer)
+    """
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM
+        from transformers import AutoTokenizer
+    except ImportError:
+        raise RuntimeError("The onnx backend needs optimum with ONNX Runtime: pip install optimum[onnxruntime]")
+
+    export_dir = os.path.join(LLM_ONNX_CACHE, DEFAULT_MODEL.replace("/", "--"))
+    os.makedirs(LLM_ONNX_CACHE, exist_ok=True)
+    with FileLock(export_dir + ".lock"):
+        if not os.path.isdir(export_dir):
+            print(f"[LLM] Exporting {DEFAULT_MODEL} to ONNX in {export_dir}...")
+            partial_dir = f"{export_dir}.partial-{os.getpid()}"
+            model = ORTModelForCausalLM.from_pretrained(DEFAULT_MODEL, export=True, use_cache=True)
+            model.save_pretrained(partial_dir)
+            AutoTokenizer.from_pretrained(DEFAULT_MODEL).save_pretrained(partial_dir)
+            os.replace(partial_dir, export_dir)
+    model = ORTModelForCausalLM.from_pretrained(export_dir, use_cache=True, provider="CPUExecutionProvider")
+    return model, AutoTokenizer.from_pretrained(export_dir)
+
+def create_generator(quantize: str = LLM_QUANTIZE, backend: str = LLM_BACKEND):
+    """
+    Build the primary model's text-generation pipeline.
+
+    Args:
+        quantize: "none" for fp32, or "int8" for dynamic int8 quantization
+            of the linear layers (weights stored as int8, activations
+            quantized on the fly); pytorch backend only
+        backend: "pytorch" or "onnx"
+
+    Returns:
+        Pipeline ready for batched generation
+    """
+    if quantize not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization mode {quantize!r}; use one of {', '.join(QUANTIZATION_MODES)}")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; use one of {', '.join(BACKENDS)}")
+    if backend == "onnx" and quantize != "none":
+        raise ValueError("Quantization is only supported with the pytorch backend")
+
+    if backend == "onnx":
+        model, tokenizer = _load_onnx_model()
+        generator = pipeline(
+            "text-generation",
+            model=model,
+            tokenizer=tokenizer,
+            pad_token_id=50256
+        )
+    else:
+        generator = pipeline(
+            "text-generation",
+            model=DEFAULT_MODEL,
+            pad_token_id=50256
+        )
+    # GPT-Neo has no pad token; batched generation pads on the left with EOS
+    generator.tokenizer.pad_token_id = 50256
+    generator.tokenizer.padding_side = "left"
+    if quantize == "int8":
+        generator.model = torch.quantization.quantize_dynamic(
+            generator.model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    return generator
+
+def load_primary_model(warm_up: bool = True, quantize: str = LLM_QUANTIZE, backend: str = LLM_BACKEND):
+    """
+    Load the primary Hugging Face model.
+
+    The model is published to request handlers only after the warm-up
+    generation, so until then they keep using the rule-based parser.
+
+    Args:
+        warm_up: Run WARMUP_REQUESTS through the model before publishing it
+        quantize: Quantization mode, see create_generator
+        backend: Inference backend, see create_generator
+    """
     global primary_generator
-    print(f"[LLM] Loading primary model: {DEFAULT_MODEL}...")
+    print(f"[LLM] Loading primary model: {DEFAULT_MODEL} (backend: {backend}, quantization: {quantize})...")
+    model_status.update(state=MODEL_LOADING, backend=backend, quantization=quantize, error=None)
+    started = time.monotonic()
     
-    primary_generator = pipeline(
-        "text-generation",
-        model=DEFAULT_MODEL,
-        pad_token_id=50256
-    )
+    try:
+        configure_torch_threads()
+        generator = create_generator(quantize, backend)
+        model_status["load_seconds"] = round(time.monotonic() - started, 3)
+        
+        if warm_up:
+            model_status["state"] = MODEL_WARMING_UP
+            started = time.monotonic()
+            _generate_batch(WARMUP_REQUESTS, generator)
+            model_status["warmup_seconds"] = round(time.monotonic() - started, 3)
+    except Exception as e:
+        model_status.update(state=MODEL_FAILED, error=str(e))
+        raise
+    
+    primary_generator = generator
+    model_status["state"] = MODEL_READY
     print("[LLM] Primary model loaded successfully.")
 
+def preload_primary_model():
+    """Load and warm up the primary model in a background thread (once)."""
+    global _preload_thread
+    with _preload_lock:
+        if _preload_thread is not None or primary_generator is not None:
+            return
+        _preload_thread = threading.Thread(target=_preload, name="model-preload", daemon=True)
+        _preload_thread.start()
+
+def _preload():
+    try:
+        load_primary_model(warm_up=True)
+    except Exception as e:
+        print(f"[LLM] Failed to load primary model, using rule-based parsing: {str(e)}")
+
+def get_model_status() -> Dict[str, Any]:
+    """Return a copy of the primary model's status."""
+    return dict(model_status, ready=model_status["state"] == MODEL_READY)
+
+def _generate_batch(requests: List[str], generator=None) -> List[str]:
+    """Run a batch of interpretation prompts through the model in one padded forward pass."""
+    prompts = [INTERPRET_PROMPT.format(request=request.strip().replace("\n", " ")) for request in requests]
+    outputs = (generator or primary_generator)(
+        prompts,
+        batch_size=len(prompts),
+        max_new_tokens=LLM_MAX_NEW_TOKENS,
+        do_sample=False,
+        return_full_text=False
+    )
+    return [output[0]["generated_text"] for output in outputs]
+
+# Shared by all request threads; only its worker thread calls the model
+interpret_queue = BatchingQueue(_generate_batch, LLM_MAX_BATCH_SIZE, LLM_MAX_WAIT_MS / 1000, name="interpret")
+
+def parse_model_output(text: str) -> Dict[str, Any]:
+    """
+    Parse the model's "key=value; ..." completion into task fields.
+
+    Only the first line is used, and only known keys with valid values are
+    kept, so a rambling or partial completion yields fewer fields rather
+    than wrong ones.
+    """
+    fields = {}
+    line = text.strip().split("\n", 1)[0]
+    for part in line.split(";"):
+        key, _, value = part.partition("=")
+        key, value = key.strip().lower(), value.strip()
+        if key == "type" and value.lower() in TASK_TYPES:
+            fields["type"] = value.lower()
+        elif key == "priority" and value.lower() in PRIORITIES:
+            fields["priority"] = value.lower()
+        elif key == "category" and value.lower() in CATEGORIES:
+            fields["category"] = value.lower()
+        elif key == "description" and 0 < len(value) <= 200:
+            fields["description"] = value
+    return fields
+
 def load_openai_fallback():
     """Load OpenAI as a fallback option if environment variable is set."""
     global fallback_generator
@@ -68,7 +309,83 @@ def get_current_date_info() -> Dict[str, str]:
         "next_monday": next_monday.strftime("%Y-%m-%d")
     }
 
+# Date-independent task fields by (normalized request text, model in use)
+interpret_cache = TTLCache(LLM_CACHE_SIZE_LIMIT, LLM_CACHE_TTL_SECONDS)
+LLM_CACHE_SIZE.set_function(lambda: len(interpret_cache))
+
+# parsedatetime Calendars keep per-parse state, so each thread reuses its own
+_calendars = threading.local()
+
+def normalize_input(user_input: str) -> str:
+    """Collapse runs of whitespace and strip the ends of a request."""
+    return " ".join(user_input.split())
+
 def interpret_user_input(user_input: str) -> Tuple[Dict[str, Any], str]:
+    """
+    Turn a natural-language request into task data.
+
+    When the primary model is loaded the request goes through the batched
+    model path, which fills in type, priority, category and description;
+    dates always come from the rule-based parser. Without the model, or
+    if it fails or times out, the rule-based result is used as is.
+
+    Everything except the date is memoized per normalized request text.
+    The date is parsed again on every call, so relative dates ("tomorrow",
+    "next monday") stay correct however old the cache entry is.
+
+    Args:
+        user_input: Request text
+
+    Returns:
+        Tuple of (task data, JSON text of the task data)
+    """
+    text = normalize_input(user_input)
+    # Entries made without the model mustn't hide it once it's loaded
+    key = (text, primary_generator is not None)
+    fields = interpret_cache.get(key)
+    if fields is not None:
+        LLM_CACHE_HITS.inc()
+    else:
+        LLM_CACHE_MISSES.inc()
+        fields, complete = _interpret_fields(text)
+        # A model failure is retried next time rather than cached
+        if complete:
+            interpret_cache.put(key, fields)
+
+    task_data = dict(fields, participants=list(fields["participants"]))
+    task_data["date"] = parse_request_date(text).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return task_data, json.dumps(task_data, indent=2)
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return size and hit-rate statistics of the interpretation cache."""
+    return interpret_cache.stats()
+
+def _interpret_fields(text: str) -> Tuple[Dict[str, Any], bool]:
+    """Interpret everything but the date; the flag is False if the model was skipped by an error."""
+    task_data = _interpret_with_rules(text)
+    if primary_generator is None:
+        return task_data, True
+    try:
+        completion = interpret_queue(text, timeout=LLM_TIMEOUT_SECONDS)
+        task_data.update(parse_model_output(completion))
+        return task_data, True
+    except Exception as e:
+        print(f"[LLM] Model interpretation failed, using rule-based result: {str(e)}")
+        return task_data, False
+
+def parse_request_date(user_input: str) -> datetime:
+    """Resolve the date in a request against the current time (tomorrow if none is found)."""
+    cal = getattr(_calendars, "calendar", None)
+    if cal is None:
+        cal = _calendars.calendar = parsedatetime.Calendar()
+    time_struct, parse_status = cal.parse(user_input)
+
+    if parse_status == 0:
+        return datetime.now() + timedelta(days=1)
+    return datetime(*time_struct[:6])
+
+def _interpret_with_rules(user_input: str) -> Dict[str, Any]:
+    """Rule-based interpretation of everything but the date (left as None)."""
     description = user_input
 
     if "remind me to " in user_input.lower():
@@ -94,21 +411,10 @@ def interpret_user_input(user_input: str) -> Tuple[Dict[str, Any], str]:
     elif "medium priority" in user_input.lower():
         priority = "medium"
 
-    # Date and time parsing using dateparser
-    cal = parsedatetime.Calendar()
-    time_struct, parse_status = cal.parse(user_input)
-
-    if parse_status == 0:
-        parsed_datetime = datetime.now() + timedelta(days=1)
-    else:
-        parsed_datetime = datetime(*time_struct[:6])
-
-    task_date = parsed_datetime
-
     task_data = {
         "type": task_type,
         "description": description,
-        "date": task_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "date": None,  # Filled in per call by parse_request_date
         "priority": priority,
         "category": "personal",
         "location": None,
@@ -117,7 +423,7 @@ def interpret_user_input(user_input: str) -> Tuple[Dict[str, Any], str]:
         "estimated_duration": 30
     }
 
-    return task_data, json.dumps(task_data, indent=2)
+    return task_data
 
 def get_task_suggestions(tasks: List[Dict[str, Any]], count: int = 3) -> List[Dict[str, Any]]:
     """
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, Request, Form, Depends, Query, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, PlainTextResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
@@ -8,11 +9,16 @@ from datetime import datetime, timedelta
 import json
 import os
 import re
+import itertools
 
-from llm_agent import interpret_user_input, get_task_suggestions, generate_summary
+from llm_agent import (interpret_user_input, get_task_suggestions, generate_summary, interpret_queue,
+                       preload_primary_model, get_model_status, get_cache_stats, LLM_PRELOAD)
 from task_scheduler import TaskScheduler
-from google_calendar import create_calendar_event, get_upcoming_events
+from google_calendar import get_upcoming_events
 from email_integration import send_email_reminder, send_task_report
+from metrics import REGISTRY
+from recurrence import is_recurring
+from task_model import parse_task_date
 
 # Flag to track if model has been loaded
 model_loaded = False
@@ -26,15 +32,35 @@ templates = Jinja2Templates(directory="templates")
 # Initialize task scheduler
 task_scheduler = TaskScheduler(tasks_file="tasks.json")
 
+# Last generated summary, keyed by snapshot ETag and day
+summary_cache = {"key": None, "summary": None}
+
+def get_summary(snapshot) -> str:
+    """Generate the task summary for a snapshot, reusing it while nothing changed."""
+    # The summary mentions "today"/"tomorrow", so the day is part of the key
+    key = (snapshot.etag, datetime.now().strftime('%Y-%m-%d'))
+    if summary_cache["key"] != key:
+        # Recurring tasks appear once per occurrence in the coming week
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        tasks = [task for task in snapshot.tasks if not is_recurring(task)]
+        tasks += task_scheduler.get_occurrences(today, today + timedelta(days=7), snapshot)
+        summary_cache["summary"] = generate_summary(tasks)
+        summary_cache["key"] = key
+    return summary_cache["summary"]
+
 # Start the scheduler on app startup
 @app.on_event("startup")
 def startup_event():
     task_scheduler.start()
+    # Serve right away; requests use the rule-based parser until the model is ready
+    if LLM_PRELOAD:
+        preload_primary_model()
 
 # Stop the scheduler on app shutdown
 @app.on_event("shutdown")
 def shutdown_event():
     task_scheduler.stop()
+    interpret_queue.stop()
 
 class TaskCreate(BaseModel):
     """Schema for task creation."""
@@ -58,20 +84,32 @@ class TaskUpdate(BaseModel):
     participants: Optional[List[str]] = None
     completed: Optional[bool] = None
 
+class BulkOperation(BaseModel):
+    """Schema for a single operation in a bulk request."""
+    op: str  # "create", "update" or "delete"
+    id: Optional[str] = None
+    task: Optional[Dict[str, Any]] = None
+
+class BulkRequest(BaseModel):
+    """Schema for bulk task mutations."""
+    operations: List[BulkOperation]
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     """Render the main page."""
     global model_loaded
-    tasks = task_scheduler.get_all_tasks()
+    # Read everything from one consistent snapshot
+    snapshot = task_scheduler.get_snapshot()
+    tasks = list(snapshot.tasks)
     
     # Get upcoming tasks for next 7 days
-    upcoming_tasks = task_scheduler.get_upcoming_tasks(days=7)
+    upcoming_tasks = task_scheduler.get_upcoming_tasks(days=7, snapshot=snapshot)
     
     # Get overdue tasks
-    overdue_tasks = task_scheduler.get_overdue_tasks()
+    overdue_tasks = task_scheduler.get_overdue_tasks(snapshot=snapshot)
     
     # Generate summary only if there are tasks to summarize
-    summary = "You have no upcoming tasks." if not tasks else generate_summary(tasks)
+    summary = "You have no upcoming tasks." if not tasks else get_summary(snapshot)
     
     # Get suggestions only if we have enough tasks - BUT DON'T DO THIS ON PAGE LOAD
     # This prevents the model from loading every time the page is visited
@@ -95,10 +133,11 @@ async def submit_task(request: Request, message: str = Form(...)):
     """Process natural language input and create a task."""
     global model_loaded
     
-    # Now we'll load the model when actually needed
+    # Suggestions are shown once the user has submitted a task
     model_loaded = True
     
-    task_data, raw_response = interpret_user_input(message)
+    # Interpretation may wait for a model batch; keep it off the event loop
+    task_data, raw_response = await run_in_threadpool(interpret_user_input, message)
     
     # Check for errors
     if "error" in task_data:
@@ -113,20 +152,13 @@ async def submit_task(request: Request, message: str = Form(...)):
     task_id = task_scheduler.add_task(task_data)
     
     # Add ALL tasks to Google Calendar, not just events
-    calendar_event_id = None
-    try:
-        # Modified: Remove the type check so all tasks get added to calendar
-        calendar_event_id = create_calendar_event(task_data)
-        if calendar_event_id:
-            task_data['calendar_event_id'] = calendar_event_id
-            task_scheduler.update_task(task_data)
-    except Exception as e:
-        # Calendar integration is optional
-        print(f"Calendar error: {str(e)}")
+    task_scheduler.sync_calendar_events([task_data])
+    calendar_event_id = task_data.get('calendar_event_id')
     
     # Now we can safely get suggestions since the model is already loaded
     suggestions = []
-    tasks = task_scheduler.get_all_tasks()
+    snapshot = task_scheduler.get_snapshot()
+    tasks = list(snapshot.tasks)
     if len(tasks) >= 2 and model_loaded:
         suggestions = get_task_suggestions(tasks, count=3)
     
@@ -136,10 +168,10 @@ async def submit_task(request: Request, message: str = Form(...)):
         "task_id": task_id,
         "raw_response": raw_response,
         "calendar_event_id": calendar_event_id,
-        "tasks": task_scheduler.get_all_tasks(),
-        "upcoming_tasks": task_scheduler.get_upcoming_tasks(days=7),
-        "overdue_tasks": task_scheduler.get_overdue_tasks(),
-        "summary": generate_summary(tasks),
+        "tasks": tasks,
+        "upcoming_tasks": task_scheduler.get_upcoming_tasks(days=7, snapshot=snapshot),
+        "overdue_tasks": task_scheduler.get_overdue_tasks(snapshot=snapshot),
+        "summary": get_summary(snapshot),
         "suggestions": suggestions,
         "has_calendar": os.path.exists('token.json')
     })
@@ -176,14 +208,7 @@ async def create_task(
     task_id = task_scheduler.add_task(task_data)
     
     # Add ALL tasks to Google Calendar, not just events
-    try:
-        # Modified: Remove the type check so all tasks get added to calendar
-        calendar_event_id = create_calendar_event(task_data)
-        if calendar_event_id:
-            task_data['calendar_event_id'] = calendar_event_id
-            task_scheduler.update_task(task_data)
-    except Exception as e:
-        print(f"Calendar error in create_task: {str(e)}")
+    task_scheduler.sync_calendar_events([task_data])
     
     # Redirect to home page
     return RedirectResponse(url="/", status_code=303)
@@ -244,22 +269,8 @@ async def update_task(
     if not success:
         raise HTTPException(status_code=400, detail="Failed to update task")
     
-    # If it has a calendar event, update the calendar
-    if 'calendar_event_id' in task:
-        try:
-            from google_calendar import update_calendar_event
-            update_calendar_event(task['calendar_event_id'], task)
-        except Exception as e:
-            print(f"Calendar update error: {str(e)}")
-    # If it doesn't have a calendar event, create one
-    else:
-        try:
-            calendar_event_id = create_calendar_event(task)
-            if calendar_event_id:
-                task['calendar_event_id'] = calendar_event_id
-                task_scheduler.update_task(task)
-        except Exception as e:
-            print(f"Calendar creation error: {str(e)}")
+    # Update the task's calendar event, or create one if it has none
+    task_scheduler.sync_calendar_events([task])
     
     # Redirect to home page
     return RedirectResponse(url="/", status_code=303)
@@ -321,7 +332,7 @@ async def get_calendar(request: Request, days: int = Query(14), setup: bool = Qu
             has_calendar = os.path.exists('token.json')
         
         # Add ALL tasks from our system to the calendar view, not just events
-        tasks = task_scheduler.get_all_tasks()
+        tasks = task_scheduler.get_snapshot().tasks
         
         # If we have tasks, add them to the events list
         if tasks:
@@ -387,9 +398,10 @@ async def api_get_tasks(
     priority: str = Query(None),
     category: str = Query(None),
     completed: bool = Query(None),
-    days: int = Query(7)
+    days: int = Query(7),
+    count_only: bool = Query(False)
 ):
-    """API endpoint to get tasks."""
+    """API endpoint to get tasks (or just their count with count_only=true)."""
     # Build criteria dictionary
     criteria = {}
     if type:
@@ -401,6 +413,10 @@ async def api_get_tasks(
     if completed is not None:
         criteria['completed'] = completed
     
+    # Count only: answered from the indexes without materializing tasks
+    if count_only and criteria:
+        return {"count": task_scheduler.count_tasks_by_criteria(criteria)}
+    
     # Get tasks based on criteria
     if criteria:
         tasks = task_scheduler.get_tasks_by_criteria(criteria)
@@ -408,8 +424,55 @@ async def api_get_tasks(
         # Default to upcoming tasks
         tasks = task_scheduler.get_upcoming_tasks(days=days)
     
+    if count_only:
+        return {"count": len(tasks)}
+    
     return {"tasks": tasks}
 
+@app.get("/api/tasks/recent")
+async def api_get_recent_tasks(
+    before: str = Query(None),
+    limit: int = Query(20, ge=1, le=200)
+):
+    """API endpoint to page through tasks by creation time, newest first."""
+    tasks = task_scheduler.get_recent_tasks(limit, before)
+    # Pass next_cursor back as "before" to get the following page
+    next_cursor = tasks[-1]['id'] if len(tasks) == limit else None
+    return {"tasks": tasks, "next_cursor": next_cursor}
+
+@app.get("/api/tasks/history")
+async def api_get_task_history(
+    start: str = Query(None),
+    end: str = Query(None),
+    type: str = Query(None),
+    priority: str = Query(None),
+    category: str = Query(None),
+    completed: bool = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """API endpoint to page through archived (expired) tasks."""
+    # Parsed like task dates (naive, "Z" accepted) so they compare with the archive's
+    start_date = parse_task_date(start) if start else None
+    end_date = parse_task_date(end) if end else None
+    if (start and start_date is None) or (end and end_date is None):
+        raise HTTPException(status_code=400, detail="start and end must be ISO dates")
+    
+    criteria = {}
+    if type:
+        criteria['type'] = type
+    if priority:
+        criteria['priority'] = priority
+    if category:
+        criteria['category'] = category
+    if completed is not None:
+        criteria['completed'] = completed
+    
+    # The archive is streamed; only the requested page is materialized
+    history = task_scheduler.get_task_history(start_date, end_date, criteria)
+    tasks = list(itertools.islice(history, offset, offset + limit))
+    return {"tasks": tasks, "offset": offset, "limit": limit}
+
 @app.post("/api/tasks")
 async def api_create_task(task: TaskCreate):
     """API endpoint to create a task."""
@@ -417,51 +480,43 @@ async def api_create_task(task: TaskCreate):
     task_id = task_scheduler.add_task(task_data)
     
     # Add all tasks to Google Calendar
-    try:
-        calendar_event_id = create_calendar_event(task_data)
-        if calendar_event_id:
-            task_data['calendar_event_id'] = calendar_event_id
-            task_data['id'] = task_id
-            task_scheduler.update_task(task_data)
-    except Exception as e:
-        print(f"API calendar error: {str(e)}")
+    task_scheduler.sync_calendar_events([task_data])
     
     return {"id": task_id, "task": task_scheduler.get_task(task_id)}
 
+@app.post("/api/tasks/bulk")
+async def api_bulk_tasks(bulk: BulkRequest):
+    """API endpoint to create, update and delete many tasks with a single write."""
+    operations = []
+    errors = {}
+    for i, operation in enumerate(bulk.operations):
+        data = operation.dict()
+        try:
+            # Validate payloads with the same schemas as the single-task endpoints
+            if operation.op == 'create':
+                data['task'] = TaskCreate(**(operation.task or {})).dict()
+            elif operation.op == 'update':
+                data['task'] = TaskUpdate(id=operation.id, **(operation.task or {})).dict(exclude_unset=True)
+        except Exception as e:
+            errors[i] = {"op": operation.op, "id": operation.id, "status": "error", "detail": str(e)}
+            continue
+        operations.append(data)
+    
+    applied = iter(task_scheduler.apply_bulk(operations))
+    results = [errors[i] if i in errors else next(applied) for i in range(len(bulk.operations))]
+    
+    return {"results": results}
+
 @app.put("/api/tasks/{task_id}")
 async def api_update_task(task_id: str, task_update: TaskUpdate):
     """API endpoint to update a task."""
-    # Get the existing task
-    task = task_scheduler.get_task(task_id)
+    # Update the provided fields (of one occurrence for an occurrence ID)
+    task = task_scheduler.edit_task(task_id, task_update.dict(exclude_unset=True))
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    # Update fields if provided
-    update_data = task_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        if key != 'id' and value is not None:  # Skip 'id' and None values
-            task[key] = value
-    
-    # Update the task
-    success = task_scheduler.update_task(task)
-    if not success:
-        raise HTTPException(status_code=400, detail="Failed to update task")
-    
     # Update calendar if needed
-    if 'calendar_event_id' in task:
-        try:
-            from google_calendar import update_calendar_event
-            update_calendar_event(task['calendar_event_id'], task)
-        except Exception as e:
-            print(f"API update calendar error: {str(e)}")
-    else:
-        try:
-            calendar_event_id = create_calendar_event(task)
-            if calendar_event_id:
-                task['calendar_event_id'] = calendar_event_id
-                task_scheduler.update_task(task)
-        except Exception as e:
-            print(f"API create calendar error: {str(e)}")
+    task_scheduler.sync_calendar_events([task])
     
     return {"task": task}
 
@@ -474,11 +529,36 @@ async def api_delete_task(task_id: str):
     return {"status": "success"}
 
 @app.get("/api/summary")
-async def api_get_summary():
-    """API endpoint to get a summary of tasks."""
-    tasks = task_scheduler.get_all_tasks()
-    summary = generate_summary(tasks)
-    return {"summary": summary}
+async def api_get_summary(request: Request, response: Response):
+    """API endpoint to get a summary of tasks (supports If-None-Match)."""
+    snapshot = task_scheduler.get_snapshot()
+    etag = f'"{snapshot.etag}-{datetime.now().strftime("%Y%m%d")}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    response.headers["ETag"] = etag
+    return {"summary": get_summary(snapshot), "version": snapshot.version}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Scheduler and reminder metrics in Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics")
+async def api_get_metrics():
+    """API endpoint to get scheduler and reminder metrics as JSON."""
+    return {"leader": task_scheduler.is_leader, "interpretation_cache": get_cache_stats(),
+            "metrics": REGISTRY.to_dict()}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Report whether the primary model is ready.
+    
+    The app serves requests in every state (falling back to the rule-based
+    parser), so this always answers 200; "ready" tells whether requests are
+    interpreted by the model.
+    """
+    return {"status": "ok", "model": get_model_status()}
 
 @app.get("/api/suggestions")
 async def api_get_suggestions(count: int = Query(3)):
@@ -0,0 +1,222 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Default histogram buckets, in seconds: from 10ms up to 1 hour
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """Add ``amount`` to the count for the given labels."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def to_dict(self):
+        with self._lock:
+            return {_format_labels(key) or "value": value for key, value in self._values.items()}
+
+
+class Gauge:
+    """Current value, either set directly or read from a callback at export time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        """Set the value for the given labels."""
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Read the gauge from ``function`` whenever metrics are exported."""
+        with self._lock:
+            self._functions[_label_key(labels)] = function
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [(self.name, key, value) for key, value in values.items()]
+
+    def to_dict(self):
+        return {_format_labels(key) or "value": value for _, key, value in self.samples()}
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count, max]
+        self._series: Dict[LabelKey, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation for the given labels."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, None]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+            series[3] = value if series[3] is None else max(series[3], value)
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        result = []
+        with self._lock:
+            for key, (counts, total, count, _) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    result.append((self.name + "_bucket", key + (("le", le),), cumulative))
+                result.append((self.name + "_sum", key, total))
+                result.append((self.name + "_count", key, count))
+        return result
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                _format_labels(key) or "value": {
+                    "count": count,
+                    "sum": round(total, 6),
+                    "avg": round(total / count, 6) if count else None,
+                    "max": maximum,
+                }
+                for key, (_, total, count, maximum) in self._series.items()
+            }
+
+
+class MetricsRegistry:
+    """Collection of named metrics that can be exported as JSON or Prometheus text."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Export all metrics as a JSON-friendly dict."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {"type": metric.kind, "values": metric.to_dict()} for metric in metrics}
+
+    def render_prometheus(self) -> str:
+        """Export all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry used by the scheduler, jobs, reminders and the model
+REGISTRY = MetricsRegistry()
+
+JOB_DURATION = REGISTRY.histogram(
+    "smarttask_job_duration_seconds", "Run time of scheduler jobs")
+JOB_ERRORS = REGISTRY.counter(
+    "smarttask_job_errors_total", "Scheduler job runs that raised an error")
+JOB_TIMEOUTS = REGISTRY.counter(
+    "smarttask_job_timeouts_total", "Scheduler job runs that exceeded their timeout")
+JOB_SKIPPED = REGISTRY.counter(
+    "smarttask_job_skipped_total", "Scheduler job runs skipped because the previous run was still going")
+JOBS_RUNNING = REGISTRY.gauge(
+    "smarttask_jobs_running", "Scheduler jobs currently running")
+
+REMINDER_SEND_DURATION = REGISTRY.histogram(
+    "smarttask_reminder_send_duration_seconds", "Time taken to deliver a reminder")
+REMINDER_LATENESS = REGISTRY.histogram(
+    "smarttask_reminder_lateness_seconds",
+    "Delay between a reminder's intended fire time and its delivery",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900))
+REMINDER_ERRORS = REGISTRY.counter(
+    "smarttask_reminder_errors_total", "Reminder deliveries that failed")
+REMINDERS_SENT = REGISTRY.counter(
+    "smarttask_reminders_sent_total", "Reminders delivered")
+REMINDERS_PENDING = REGISTRY.gauge(
+    "smarttask_reminders_pending", "Reminders scheduled but not yet due")
+REMINDERS_QUEUED = REGISTRY.gauge(
+    "smarttask_reminders_queued", "Due reminders waiting for a delivery worker")
+
+LLM_BATCH_SIZE = REGISTRY.histogram(
+    "smarttask_llm_batch_size", "Requests per model inference batch",
+    buckets=(1, 2, 4, 8, 16, 32))
+LLM_QUEUE_WAIT = REGISTRY.histogram(
+    "smarttask_llm_queue_wait_seconds", "Time a request waited for its inference batch to start",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5))
+LLM_INFERENCE_DURATION = REGISTRY.histogram(
+    "smarttask_llm_inference_duration_seconds", "Run time of one model inference batch")
+LLM_ERRORS = REGISTRY.counter(
+    "smarttask_llm_errors_total", "Model inference batches that raised an error")
+LLM_CACHE_HITS = REGISTRY.counter(
+    "smarttask_llm_cache_hits_total", "Request interpretations served from the cache")
+LLM_CACHE_MISSES = REGISTRY.counter(
+    "smarttask_llm_cache_misses_total", "Request interpretations that had to be computed")
+LLM_CACHE_SIZE = REGISTRY.gauge(
+    "smarttask_llm_cache_size", "Entries in the request interpretation cache")
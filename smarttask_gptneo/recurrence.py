@@ -0,0 +1,222 @@
+import calendar
+import functools
+from datetime import datetime, timedelta
+from itertools import islice, takewhile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from task_model import parse_task_date, to_timestamp
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Months per step for month-based frequencies, seconds per step otherwise
+_MONTH_STEPS = {'monthly': 1, 'yearly': 12}
+_SECOND_STEPS = {'daily': 86400, 'weekly': 7 * 86400}
+
+# Separates the series ID from the occurrence date in occurrence IDs
+OCCURRENCE_SEPARATOR = '@'
+
+
+def is_recurring(task) -> bool:
+    """Return True if the task has a recurrence rule."""
+    rule = task.get('recurrence')
+    return isinstance(rule, str) and rule.strip().lower() not in ('', 'none')
+
+
+def parse_rule(rule: str) -> Optional[Tuple[str, int, Optional[int], Optional[float]]]:
+    """
+    Parse a recurrence rule.
+
+    Accepts the plain frequencies used by the UI ("daily", "weekly",
+    "monthly", "yearly") and the RRULE subset FREQ/INTERVAL/COUNT/UNTIL,
+    e.g. "RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=10".
+
+    Args:
+        rule: Recurrence rule string
+
+    Returns:
+        Tuple of (frequency, interval, count, until timestamp), or None if invalid
+    """
+    rule = rule.strip()
+    if rule.upper().startswith('RRULE:'):
+        rule = rule[6:]
+    if '=' not in rule:
+        freq = rule.lower()
+        return (freq, 1, None, None) if freq in _MONTH_STEPS or freq in _SECOND_STEPS else None
+
+    parts = {}
+    for part in rule.split(';'):
+        key, _, value = part.partition('=')
+        parts[key.strip().upper()] = value.strip()
+    freq = parts.get('FREQ', '').lower()
+    if freq not in _MONTH_STEPS and freq not in _SECOND_STEPS:
+        return None
+    try:
+        interval = max(1, int(parts.get('INTERVAL', 1)))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        return None
+    until = None
+    if 'UNTIL' in parts:
+        until_date = _parse_until(parts['UNTIL'])
+        if until_date is None:
+            return None
+        until = to_timestamp(until_date)
+    return freq, interval, count, until
+
+
+def _parse_until(value: str) -> Optional[datetime]:
+    """Parse an RRULE UNTIL value (basic or ISO format)."""
+    for fmt, length in (('%Y%m%dT%H%M%S', 15), ('%Y%m%d', 8)):
+        try:
+            return datetime.strptime(value.rstrip('Z')[:length], fmt)
+        except ValueError:
+            continue
+    return parse_task_date(value)
+
+
+def _add_months(anchor: datetime, months: int) -> datetime:
+    """Shift a datetime by whole months, clamping the day to the month's length."""
+    month_index = anchor.month - 1 + months
+    year, month = anchor.year + month_index // 12, month_index % 12 + 1
+    day = min(anchor.day, calendar.monthrange(year, month)[1])
+    return anchor.replace(year=year, month=month, day=day)
+
+
+def _iter_timestamps(rule: str, anchor_ts: float, start_ts: float) -> Iterator[float]:
+    """Yield occurrence timestamps at or after start_ts, computed without walking from the anchor."""
+    parsed = parse_rule(rule)
+    if parsed is None:
+        return
+    freq, interval, count, until = parsed
+
+    if freq in _SECOND_STEPS:
+        period = _SECOND_STEPS[freq] * interval
+        index = max(0, -int((anchor_ts - start_ts) // period))
+        step = lambda i: anchor_ts + i * period
+    else:
+        anchor = _EPOCH + timedelta(seconds=anchor_ts)
+        start = _EPOCH + timedelta(seconds=start_ts)
+        months = _MONTH_STEPS[freq] * interval
+        elapsed = (start.year - anchor.year) * 12 + start.month - anchor.month
+        # One step early, since the day/time may put that step before start
+        index = max(0, elapsed // months - 1)
+        step = lambda i: to_timestamp(_add_months(anchor, i * months))
+
+    while count is None or index < count:
+        ts = step(index)
+        if until is not None and ts > until:
+            return
+        if ts >= start_ts:
+            yield ts
+        index += 1
+
+
+@functools.lru_cache(maxsize=4096)
+def occurrence_timestamps(rule: str, anchor_ts: float, start_ts: float, end_ts: float) -> Tuple[float, ...]:
+    """
+    Occurrence timestamps of a rule anchored at anchor_ts within [start_ts, end_ts).
+
+    Memoized per (rule, anchor, window); callers round windows to whole
+    days so repeated queries during a day hit the cache.
+    """
+    return tuple(takewhile(lambda ts: ts < end_ts, _iter_timestamps(rule, anchor_ts, start_ts)))
+
+
+def occurrence_id(task_id: str, occurrence_date: str) -> str:
+    """ID of one occurrence of a recurring task."""
+    return f"{task_id}{OCCURRENCE_SEPARATOR}{occurrence_date}"
+
+
+def split_occurrence_id(occurrence: str) -> Optional[Tuple[str, str]]:
+    """Split an occurrence ID into (series ID, occurrence date), or None if it isn't one."""
+    task_id, separator, occurrence_date = occurrence.rpartition(OCCURRENCE_SEPARATOR)
+    if not separator or not task_id or parse_task_date(occurrence_date) is None:
+        return None
+    return task_id, occurrence_date
+
+
+def _occurrence(task, ts: float) -> Optional[Dict[str, Any]]:
+    """Build one occurrence of a series, applying its override; None if cancelled."""
+    occurrence_date = (_EPOCH + timedelta(seconds=ts)).isoformat()
+    overrides = task.get('recurrence_overrides') or {}
+    if occurrence_date in overrides and overrides[occurrence_date] is None:
+        return None
+
+    occurrence = task.to_dict() if hasattr(task, 'to_dict') else dict(task)
+    occurrence.pop('recurrence_overrides', None)
+    occurrence.pop('completed_at', None)
+    # Reminders are tracked per occurrence, through its override
+    occurrence.pop('reminded', None)
+    occurrence['completed'] = False
+    occurrence['date'] = occurrence_date
+    occurrence.update(overrides.get(occurrence_date) or {})
+    occurrence['id'] = occurrence_id(task['id'], occurrence_date)
+    occurrence['occurrence_of'] = task['id']
+    occurrence['occurrence_date'] = occurrence_date
+    return occurrence
+
+
+def _anchor(task) -> Optional[float]:
+    """Timestamp of the series' first occurrence, or None if it can't recur."""
+    if not is_recurring(task) or 'id' not in task or task.get('completed', False):
+        return None
+    task_date = parse_task_date(task.get('date'))
+    return to_timestamp(task_date) if task_date else None
+
+
+def expand(task, start: datetime, end: datetime, include_completed: bool = True) -> List[Dict[str, Any]]:
+    """
+    Expand a recurring task into its occurrences with start <= date < end.
+
+    Only the requested window is computed. A completed series has no
+    occurrences. Overrides in the task's ``recurrence_overrides`` (keyed by
+    the occurrence's original ISO date) replace fields of that occurrence,
+    or cancel it when the value is None.
+
+    Args:
+        task: Recurring task (dict or Task record)
+        start: Window start
+        end: Window end
+        include_completed: Include occurrences completed via an override
+
+    Returns:
+        List of occurrence dictionaries, sorted by original date
+    """
+    anchor_ts = _anchor(task)
+    if anchor_ts is None:
+        return []
+    start_ts, end_ts = to_timestamp(start), to_timestamp(end)
+    # Round the window out to whole days so the memo is shared between calls
+    day_start = start_ts - start_ts % 86400
+    day_end = end_ts - end_ts % 86400 + 86400
+    result = []
+    for ts in occurrence_timestamps(task['recurrence'], anchor_ts, day_start, day_end):
+        if not start_ts <= ts < end_ts:
+            continue
+        occurrence = _occurrence(task, ts)
+        if occurrence is None:
+            continue
+        if include_completed or not occurrence.get('completed', False):
+            result.append(occurrence)
+    return result
+
+
+def next_occurrences(task, after: datetime, limit: int = 1) -> List[Dict[str, Any]]:
+    """
+    Get the next uncompleted, uncancelled occurrences dated after a moment.
+
+    Args:
+        task: Recurring task (dict or Task record)
+        after: Only occurrences later than this
+        limit: Maximum number of occurrences
+
+    Returns:
+        List of occurrence dictionaries, soonest first
+    """
+    anchor_ts = _anchor(task)
+    if anchor_ts is None:
+        return []
+    after_ts = to_timestamp(after)
+    occurrences = (_occurrence(task, ts) for ts in _iter_timestamps(task['recurrence'], anchor_ts, after_ts)
+                   if ts > after_ts)
+    return list(islice((o for o in occurrences if o is not None and not o.get('completed', False)), limit))
@@ -0,0 +1,596 @@
+import heapq
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import (REMINDER_ERRORS, REMINDER_LATENESS, REMINDER_SEND_DURATION, REMINDERS_PENDING,
+                     REMINDERS_QUEUED, REMINDERS_SENT)
+from task_model import to_timestamp
+
+# How long before a task's date its reminder is sent
+REMINDER_LEAD_SECONDS = 15 * 60
+
+# Reminders are delivered by a fixed pool of this many threads
+REMINDER_WORKERS = int(os.environ.get('REMINDER_WORKERS', 4))
+
+# Opt-in: a due reminder is held back until the reminders due within this
+# many seconds after it are due too, and they are delivered together so the
+# sender can merge them into one email per recipient. 0 sends every
+# reminder at its own time; reminders are never sent early.
+REMINDER_DIGEST_WINDOW = float(os.environ.get('REMINDER_DIGEST_WINDOW', 0))
+
+# Upper bound on a single sleep, so wall-clock jumps (DST, NTP) are noticed
+MAX_WAIT_SECONDS = 300
+
+# A claim not refreshed for this long belongs to a process that died or
+# hung mid-delivery
+CLAIM_TIMEOUT_SECONDS = 10 * 60
+
+# How often a dispatcher refreshes the claims of reminders it is still sending
+CLAIM_REFRESH_SECONDS = 60
+
+# A reminder whose send fails is retried after REMINDER_RETRY_SECONDS,
+# doubling after each further failure, and given up after this many attempts
+REMINDER_MAX_ATTEMPTS = 5
+REMINDER_RETRY_SECONDS = 60
+
+
+def wall_clock() -> float:
+    """Current local wall-clock time in the same scale as Task.date_ts."""
+    return to_timestamp(datetime.now())
+
+
+def _process_alive(pid: Optional[str]) -> bool:
+    """Return False only if no process with this PID exists on this host."""
+    try:
+        pid = int(pid)
+    except (TypeError, ValueError):
+        return False
+    if pid == os.getpid() or os.name == 'nt':
+        # Signal 0 would terminate the process on Windows; rely on the timeout
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to another user
+        return True
+    return True
+
+
+class ReminderQueue:
+    """Durable reminder queue kept in a SQLite database.
+
+    Every reminder is a row keyed by ``<task id>:<fire time>``, so the same
+    reminder gets the same key in every process and across restarts. Its
+    state moves from ``pending`` to ``claimed`` (a worker won the atomic
+    claim and is sending it) to ``sent``, or to ``cancelled`` when the task
+    changes. A failed send puts the reminder back to ``pending`` with a
+    later ``retry_ts``; it only becomes ``failed`` once
+    REMINDER_MAX_ATTEMPTS sends have failed. Only one process can claim a
+    pending row, so each reminder is delivered once. The claiming process
+    refreshes ``claimed_at`` while it is still sending, so a slow send
+    keeps its claim. If a process dies after claiming,
+    release_stale_claims() returns the reminder to ``pending`` (at once if
+    the claiming process is gone, otherwise once the claim has not been
+    refreshed for CLAIM_TIMEOUT_SECONDS) and it is retried.
+    """
+
+    def __init__(self, db_file: str = "tasks_reminders.db"):
+        """Open (and if needed create) the queue database."""
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        # Autocommit; multi-statement updates use explicit transactions
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self.is_new = self._create_schema()
+
+    def _create_schema(self) -> bool:
+        """Create the reminders table; return True if it didn't exist."""
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reminders'").fetchone()
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS reminders (
+                    key TEXT PRIMARY KEY,
+                    task_id TEXT NOT NULL,
+                    fire_ts REAL NOT NULL,
+                    state TEXT NOT NULL,
+                    claimed_at REAL,
+                    claimed_by TEXT,
+                    finished_at REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    retry_ts REAL
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(reminders)")}
+            if 'attempts' not in columns:
+                # Queues created before retries existed
+                self._conn.execute("ALTER TABLE reminders ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+                self._conn.execute("ALTER TABLE reminders ADD COLUMN retry_ts REAL")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reminders_state ON reminders(state, fire_ts)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_reminders_task ON reminders(task_id, state)")
+            return exists is None
+
+    @staticmethod
+    def key(task_id: str, fire_ts: float) -> str:
+        """Deterministic key of a task's reminder at a given fire time."""
+        return f"{task_id}:{int(fire_ts)}"
+
+    def schedule(self, task_id: str, fire_ts: float) -> Optional[float]:
+        """
+        Make this the task's pending reminder, cancelling any other one.
+
+        Args:
+            task_id: ID of the task
+            fire_ts: When to fire, on the Task.date_ts scale
+
+        Returns:
+            When to try sending it (later than fire_ts if a send already
+            failed), or None if it was already claimed, sent or given up
+        """
+        key = self.key(task_id, fire_ts)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE reminders SET state = 'cancelled' "
+                    "WHERE task_id = ? AND state = 'pending' AND key != ?", (task_id, key))
+                self._conn.execute(
+                    "INSERT INTO reminders (key, task_id, fire_ts, state) VALUES (?, ?, ?, 'pending') "
+                    "ON CONFLICT(key) DO UPDATE SET state = 'pending' WHERE state = 'cancelled'",
+                    (key, task_id, fire_ts))
+                state, retry_ts = self._conn.execute(
+                    "SELECT state, retry_ts FROM reminders WHERE key = ?", (key,)).fetchone()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if state != 'pending':
+            return None
+        return max(fire_ts, retry_ts or fire_ts)
+
+    def cancel(self, task_id: str):
+        """Cancel the task's pending reminder, if any."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE reminders SET state = 'cancelled' WHERE task_id = ? AND state = 'pending'",
+                (task_id,))
+
+    def claim(self, task_id: str, fire_ts: float) -> bool:
+        """Atomically claim a pending reminder for delivery; False if someone else has it."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE reminders SET state = 'claimed', claimed_at = ?, claimed_by = ? "
+                "WHERE key = ? AND state = 'pending'",
+                (time.time(), str(os.getpid()), self.key(task_id, fire_ts)))
+            return cursor.rowcount == 1
+
+    def refresh_claims(self) -> int:
+        """Mark this process's claims as still being worked on; return how many there are."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE reminders SET claimed_at = ? WHERE state = 'claimed' AND claimed_by = ?",
+                (time.time(), str(os.getpid())))
+            return cursor.rowcount
+
+    def retry(self, task_id: str, fire_ts: float, now: float) -> Optional[float]:
+        """
+        Record a failed send of a claimed reminder and schedule its next attempt.
+
+        Args:
+            task_id: ID of the task
+            fire_ts: Fire time of the reminder
+            now: Current time, on the Task.date_ts scale
+
+        Returns:
+            When to retry, or None if the reminder was given up (or not claimed)
+        """
+        key = self.key(task_id, fire_ts)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT attempts FROM reminders WHERE key = ? AND state = 'claimed'", (key,)).fetchone()
+                retry_ts = None
+                if row is not None:
+                    attempts = row[0] + 1
+                    if attempts < REMINDER_MAX_ATTEMPTS:
+                        retry_ts = now + REMINDER_RETRY_SECONDS * 2 ** (attempts - 1)
+                        self._conn.execute(
+                            "UPDATE reminders SET state = 'pending', attempts = ?, retry_ts = ?, "
+                            "claimed_at = NULL, claimed_by = NULL WHERE key = ?",
+                            (attempts, retry_ts, key))
+                    else:
+                        self._conn.execute(
+                            "UPDATE reminders SET state = 'failed', attempts = ?, finished_at = ? WHERE key = ?",
+                            (attempts, time.time(), key))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return retry_ts
+
+    def finish(self, task_id: str, fire_ts: float, sent: bool = True):
+        """Record the outcome of a claimed reminder."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE reminders SET state = ?, finished_at = ? WHERE key = ? AND state = 'claimed'",
+                ('sent' if sent else 'failed', time.time(), self.key(task_id, fire_ts)))
+
+    def is_done(self, task_id: str, fire_ts: float) -> bool:
+        """Return True if this reminder was already claimed, delivered or given up."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM reminders WHERE key = ?", (self.key(task_id, fire_ts),)).fetchone()
+        return row is not None and row[0] in ('claimed', 'sent', 'failed')
+
+    def pending(self) -> List[Tuple[str, float, float]]:
+        """Return (task_id, fire_ts, when to try sending it) of every pending reminder."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT task_id, fire_ts, MAX(fire_ts, COALESCE(retry_ts, fire_ts)) FROM reminders "
+                "WHERE state = 'pending' ORDER BY fire_ts"
+            ).fetchall()
+
+    def release_stale_claims(self) -> List[Tuple[str, float]]:
+        """
+        Return reminders claimed by a dead or stuck process to the queue.
+
+        A claim is stale if the claiming process no longer exists or the
+        claim was not refreshed for CLAIM_TIMEOUT_SECONDS. A stale reminder becomes
+        pending again, unless the task got a newer pending reminder in the
+        meantime, which supersedes it.
+
+        Returns:
+            (task_id, fire_ts) of the reminders made pending again
+        """
+        cutoff = time.time() - CLAIM_TIMEOUT_SECONDS
+        released = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT key, task_id, fire_ts, claimed_at, claimed_by FROM reminders "
+                    "WHERE state = 'claimed'").fetchall()
+                for key, task_id, fire_ts, claimed_at, claimed_by in rows:
+                    if (claimed_at or 0) >= cutoff and _process_alive(claimed_by):
+                        continue
+                    superseded = self._conn.execute(
+                        "SELECT 1 FROM reminders WHERE task_id = ? AND state = 'pending'",
+                        (task_id,)).fetchone()
+                    self._conn.execute(
+                        "UPDATE reminders SET state = ?, claimed_at = NULL, claimed_by = NULL WHERE key = ?",
+                        ('cancelled' if superseded else 'pending', key))
+                    if not superseded:
+                        released.append((task_id, fire_ts))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if released:
+            logging.warning(f"Released {len(released)} reminder(s) claimed by a dead or stuck process")
+        return released
+
+    def prune(self, before_ts: float) -> int:
+        """Delete finished and cancelled reminders that fired before the given time."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM reminders WHERE state IN ('sent', 'failed', 'cancelled') AND fire_ts < ?",
+                (before_ts,))
+            return cursor.rowcount
+
+
+class ReminderDispatcher:
+    """Event-driven reminder scheduler backed by a min-heap of fire times.
+
+    Each dated task gets one pending reminder at ``date - lead`` (or right
+    away if that moment has already passed but the task hasn't started).
+    A single thread sleeps until the earliest fire time, so idle cost does
+    not depend on how many tasks are stored, and hands due reminders to a
+    bounded worker pool so slow email delivery never delays the next
+    reminder. The thread count stays constant however many reminders are
+    pending. Rescheduling or cancelling a reminder just records the new
+    state; stale heap entries are skipped when they surface.
+
+    The heap is an in-memory index over a durable ReminderQueue: changes
+    are written through to the queue, load() resumes from it after a
+    restart, and a worker must claim a reminder in the queue before
+    sending it, which also drops reminders cancelled while waiting. Only
+    a started dispatcher (the leader's) keeps the heap; a stopped one
+    writes changes through to the queue only, for the leader to pick up.
+
+    All reminders due at the same time are delivered in one ``send``
+    call, letting the sender coalesce emails per recipient. With a
+    ``batch_window``, a due reminder waits (up to the window late) for
+    the reminders due within the window after it, so they go out
+    together; reminders never go out before they are due.
+    """
+
+    def __init__(self, send: Callable[[List[str]], Iterable[str]], queue: ReminderQueue,
+                 lead_seconds: float = REMINDER_LEAD_SECONDS,
+                 clock: Callable[[], float] = wall_clock, workers: int = REMINDER_WORKERS,
+                 batch_window: float = REMINDER_DIGEST_WINDOW):
+        """
+        Create the dispatcher; call start() to begin firing reminders.
+
+        Args:
+            send: Called with the IDs of tasks whose reminders are due;
+                returns the IDs whose delivery failed (raising fails them all)
+            queue: Durable queue holding reminder state
+            lead_seconds: How long before the task date to fire
+            clock: Returns the current time on the Task.date_ts scale
+            workers: Number of delivery threads
+            batch_window: Seconds a due reminder may wait for later ones to send them together
+        """
+        self.send = send
+        self.queue = queue
+        self.lead_seconds = lead_seconds
+        self.clock = clock
+        self.batch_window = batch_window
+        # (wake_ts, seq, task_id, fire_ts, due_ts); wake_ts is when to try
+        # sending (later than fire_ts for a retry), due_ts when the reminder
+        # was meant to go out (later than fire_ts if it was scheduled late)
+        self._heap = []
+        self._entries: Dict[str, float] = {}  # task_id -> current fire_ts
+        self._seq = itertools.count()
+        self._queued = 0  # due reminders handed to the pool but not yet taken
+        self._sending = 0  # claimed reminders whose send hasn't returned
+        self._claims_refreshed = 0.0
+        self._cond = threading.Condition()
+        self.workers = workers
+        self._executor = None
+        self._thread = None
+        self._running = False
+
+    def load(self):
+        """Resume the pending reminders stored in the queue, including stale claims."""
+        self.queue.release_stale_claims()
+        with self._cond:
+            for task_id, fire_ts, wake_ts in self.queue.pending():
+                if self._entries.get(task_id) != fire_ts:
+                    self._push(task_id, fire_ts, wake_ts)
+            self._cond.notify()
+
+    def release_stale_claims(self) -> int:
+        """
+        Retry reminders whose claiming process died or got stuck.
+
+        Called periodically by the leader, since a claim taken just before
+        a failover is still too young to release at election time.
+
+        Returns:
+            Number of reminders put back into the heap
+        """
+        released = self.queue.release_stale_claims()
+        with self._cond:
+            for task_id, fire_ts in released:
+                # A reminder scheduled for the task since then takes precedence
+                if task_id not in self._entries:
+                    self._push(task_id, fire_ts)
+            if released:
+                self._cond.notify()
+        return len(released)
+
+    def _push(self, task_id: str, fire_ts: float, wake_ts: Optional[float] = None):
+        """Add a reminder to the heap, to be tried at wake_ts (default fire_ts); caller holds the condition."""
+        self._entries[task_id] = fire_ts
+        wake_ts = fire_ts if wake_ts is None else wake_ts
+        heapq.heappush(self._heap, (wake_ts, next(self._seq), task_id, fire_ts, max(fire_ts, self.clock())))
+
+    def start(self):
+        """Start the dispatch thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="reminder-send")
+        REMINDERS_PENDING.set_function(self.pending)
+        REMINDERS_QUEUED.set_function(lambda: self._queued)
+        self._thread = threading.Thread(target=self._run, name="reminder-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 1.0):
+        """Stop the dispatch thread; pending reminders are kept in the queue for load()."""
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._entries.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def fire_time(self, task) -> Optional[float]:
+        """Return when the task's reminder should fire, or None if it needs none."""
+        if 'id' not in task or task.get('completed', False):
+            return None
+        date_ts = task.date_ts
+        if date_ts is None or date_ts <= self.clock():
+            return None
+        return date_ts - self.lead_seconds
+
+    def schedule(self, task):
+        """
+        Schedule, move or cancel a task's reminder to match its current state.
+
+        Args:
+            task: Task record
+        """
+        fire_ts = self.fire_time(task)
+        if fire_ts is None:
+            if 'id' in task:
+                self.cancel(task['id'])
+            return
+        with self._cond:
+            self._set(task['id'], fire_ts)
+
+    def cancel(self, task_id: str):
+        """Cancel a task's pending reminder, including one waiting for delivery."""
+        with self._cond:
+            self._entries.pop(task_id, None)
+            self.queue.cancel(task_id)
+
+    def sync(self, tasks: Iterable):
+        """
+        Reconcile pending reminders with the given tasks.
+
+        Reminders for tasks not in ``tasks`` are cancelled. Reminders whose
+        fire time is unchanged are left alone, so repeated syncs are cheap.
+
+        Args:
+            tasks: Task records that may need reminders (e.g. all future tasks)
+        """
+        wanted = {}
+        for task in tasks:
+            fire_ts = self.fire_time(task)
+            if fire_ts is not None:
+                wanted[task['id']] = fire_ts
+
+        with self._cond:
+            for task_id in list(self._entries):
+                if task_id not in wanted:
+                    del self._entries[task_id]
+                    self.queue.cancel(task_id)
+            for task_id, fire_ts in wanted.items():
+                self._set(task_id, fire_ts)
+
+    def pending(self) -> int:
+        """Number of reminders waiting to fire."""
+        with self._cond:
+            return len(self._entries)
+
+    def next_fire_time(self) -> Optional[float]:
+        """When the earliest pending reminder is next tried, or None."""
+        with self._cond:
+            self._discard_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def _set(self, task_id: str, fire_ts: float):
+        """Record a reminder; caller holds the condition."""
+        if self._entries.get(task_id) == fire_ts:
+            return
+        # Also cancels the reminder for the old time; None means already sent
+        wake_ts = self.queue.schedule(task_id, fire_ts)
+        if wake_ts is None:
+            self._entries.pop(task_id, None)
+            return
+        if not self._running:
+            # Standby: the leader picks the change up from the queue
+            return
+        self._push(task_id, fire_ts, wake_ts)
+        # Wake the dispatcher if this is the new earliest reminder
+        if self._heap[0][2] == task_id:
+            self._cond.notify()
+
+    def _discard_stale(self):
+        """Drop heap entries that were cancelled or rescheduled."""
+        while self._heap and self._entries.get(self._heap[0][2]) != self._heap[0][3]:
+            heapq.heappop(self._heap)
+
+    def _refresh_claims(self):
+        """Keep the claims of reminders still being sent from looking stale."""
+        self._claims_refreshed = time.monotonic()
+        try:
+            self.queue.refresh_claims()
+        except Exception as e:
+            logging.warning(f"Error refreshing reminder claims: {str(e)}")
+
+    def _run(self):
+        """Sleep until reminders are due and fire them, together with any held back for a digest."""
+        batch = []  # due reminders held back for the digest window
+        held_since = None
+        while True:
+            if self._sending and time.monotonic() - self._claims_refreshed >= CLAIM_REFRESH_SECONDS:
+                self._refresh_claims()
+            with self._cond:
+                if not self._running:
+                    return
+                self._discard_stale()
+                now = self.clock()
+                while self._heap and self._heap[0][0] <= now:
+                    wake_ts, _, task_id, fire_ts, due_ts = heapq.heappop(self._heap)
+                    if self._entries.get(task_id) == fire_ts:
+                        del self._entries[task_id]
+                        batch.append((task_id, fire_ts, due_ts))
+                        held_since = wake_ts if held_since is None else held_since
+                    self._discard_stale()
+
+                # Wait for the next reminder unless the batch is ready to go
+                wake_ts = self._heap[0][0] if self._heap else None
+                if not batch or (wake_ts is not None and wake_ts <= held_since + self.batch_window):
+                    timeout = MAX_WAIT_SECONDS
+                    if wake_ts is not None:
+                        timeout = min(timeout, wake_ts - now)
+                    if self._sending:
+                        timeout = min(timeout, CLAIM_REFRESH_SECONDS)
+                    self._cond.wait(timeout)
+                    continue
+
+                ready, batch, held_since = batch, [], None
+                self._queued += len(ready)
+
+            self._executor.submit(self._deliver, ready)
+
+    def _deliver(self, batch: List[Tuple[str, float, float]]):
+        """Send due reminders on a worker thread, skipping any cancelled or taken."""
+        with self._cond:
+            self._queued -= len(batch)
+        claimed = []
+        for task_id, fire_ts, due_ts in batch:
+            try:
+                if self.queue.claim(task_id, fire_ts):
+                    claimed.append((task_id, fire_ts, due_ts))
+            except Exception as e:
+                logging.warning(f"Error claiming reminder for task {task_id}: {str(e)}")
+        if not claimed:
+            return
+
+        task_ids = [task_id for task_id, _, _ in claimed]
+        with self._cond:
+            self._sending += len(claimed)
+            # Have the dispatcher refresh the claims while the send runs
+            self._cond.notify()
+        started = time.monotonic()
+        try:
+            failed = set(self.send(task_ids) or ())
+        except Exception as e:
+            failed = set(task_ids)
+            logging.warning(f"Error sending reminders for tasks {task_ids}: {str(e)}")
+        finally:
+            with self._cond:
+                self._sending -= len(claimed)
+        REMINDER_SEND_DURATION.observe(time.monotonic() - started)
+
+        # Lateness is measured at delivery, so it includes the send itself
+        now = self.clock()
+        for task_id, fire_ts, due_ts in claimed:
+            try:
+                if task_id not in failed:
+                    REMINDERS_SENT.inc()
+                    REMINDER_LATENESS.observe(max(0.0, now - due_ts))
+                    self.queue.finish(task_id, fire_ts)
+                    continue
+                REMINDER_ERRORS.inc()
+                retry_ts = self.queue.retry(task_id, fire_ts, now)
+                if retry_ts is None:
+                    logging.warning(f"Giving up on the reminder for task {task_id}")
+                    continue
+                with self._cond:
+                    # A reminder scheduled for the task since then takes precedence
+                    if self._running and task_id not in self._entries:
+                        self._push(task_id, fire_ts, retry_ts)
+                        self._cond.notify()
+            except Exception as e:
+                logging.warning(f"Error recording reminder outcome for task {task_id}: {str(e)}")
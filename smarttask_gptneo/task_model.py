@@ -0,0 +1,125 @@
+import sys
+from datetime import datetime
+from typing import Dict, Any, Optional, Iterator
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Fields whose values come from a small fixed vocabulary; interned so that
+# thousands of tasks share one string object per value
+INTERNED_FIELDS = ('type', 'priority', 'category', 'source', 'recurrence')
+
+_MISSING = object()
+
+
+def parse_task_date(date_str: Any) -> Optional[datetime]:
+    """Parse a task's ISO date into a naive datetime, or None if invalid."""
+    if not isinstance(date_str, str):
+        return None
+    try:
+        return datetime.fromisoformat(date_str.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def to_timestamp(dt: datetime) -> float:
+    """Convert a (naive) datetime to seconds since the epoch, ignoring tzinfo."""
+    return (dt.replace(tzinfo=None) - _EPOCH).total_seconds()
+
+
+class Task:
+    """Compact, read-only task record.
+
+    Replaces the free-form task dict inside the stores: known fields live
+    in ``__slots__`` (unset slots mean the key was absent), enum-like
+    strings are interned, and the date is parsed once into an integer
+    ``date_ts`` (seconds since the epoch, wall-clock time). Unknown keys
+    are kept in ``extra`` so nothing is lost on a round trip.
+
+    Tasks also support read-only mapping access (``task['description']``,
+    ``task.get('date')``, ``'id' in task``), so templates and helpers that
+    only read tasks can use them directly. Use ``to_dict()`` at the API
+    boundary or before modifying a task.
+    """
+
+    FIELDS = (
+        'id', 'type', 'description', 'date', 'priority', 'category', 'location',
+        'participants', 'recurrence', 'estimated_duration', 'created_at',
+        'completed', 'completed_at', 'reminded', 'source', 'calendar_event_id',
+    )
+    __slots__ = FIELDS + ('date_ts', 'extra')
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Task':
+        """
+        Build a task record from a task dictionary.
+
+        Args:
+            data: Task dictionary as stored in tasks.json
+
+        Returns:
+            Task record
+        """
+        task = cls()
+        extra = None
+        for key, value in data.items():
+            if key in cls.FIELDS:
+                if key in INTERNED_FIELDS and isinstance(value, str):
+                    value = sys.intern(value)
+                object.__setattr__(task, key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        object.__setattr__(task, 'extra', extra)
+
+        task_date = parse_task_date(data.get('date'))
+        object.__setattr__(task, 'date_ts', int(to_timestamp(task_date)) if task_date else None)
+        return task
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Task records are read-only; use to_dict() to modify a copy")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the task as a new dictionary."""
+        result = {}
+        for key in self.FIELDS:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                result[key] = value
+        if self.extra:
+            result.update(self.extra)
+        return result
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return a field's value, or default if the task doesn't have it."""
+        if key in self.FIELDS:
+            return getattr(self, key, default)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def matches(self, criteria: Dict[str, Any]) -> bool:
+        """Return True if every criteria field is present and equal."""
+        for key, value in criteria.items():
+            field_value = self.get(key, _MISSING)
+            if field_value is _MISSING or field_value != value:
+                return False
+        return True
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.to_dict())
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def __repr__(self) -> str:
+        return f"Task({self.to_dict()!r})"
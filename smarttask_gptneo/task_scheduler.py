@@ -1,45 +1,116 @@
 import os
-import json
 import time
+import heapq
+import itertools
 import threading
 import schedule
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Iterator
 
 from google_calendar import create_calendar_event, get_upcoming_events
-from email_integration import send_email_reminder, scan_inbox_for_tasks
+from email_integration import InboxScanError, send_reminder_batch, scan_inbox_for_tasks
+from task_model import Task, parse_task_date, to_timestamp
+from reminders import ReminderDispatcher, ReminderQueue
+from jobs import JobExecutor
+from archive import TaskArchive
+from leader import LeaderLease
+from ids import new_task_id
+from task_store import open_task_store, task_timestamp, TaskSnapshot
+from recurrence import is_recurring, expand, next_occurrences, split_occurrence_id
+
+# How often the scheduler checks for task changes made by other processes
+REMINDER_SYNC_SECONDS = 30
+
+# Most expired tasks archived per cleanup run, so each run stays small
+CLEANUP_BATCH_SIZE = 500
+
+# Wall-clock limit for one run of each scheduler job, in seconds
+JOB_TIMEOUTS = {
+    'check_approaching_tasks': 5 * 60,
+    'import_tasks_from_email': 10 * 60,
+    'sync_with_calendar': 10 * 60,
+    'cleanup_old_tasks': 10 * 60,
+}
 
 class TaskScheduler:
     """Task scheduling and management system for the SmartTask assistant."""
     
-    def __init__(self, tasks_file="tasks.json"):
-        """Initialize the task scheduler."""
+    def __init__(self, tasks_file="tasks.json", storage=None):
+        """Initialize the task scheduler.
+
+        Args:
+            tasks_file: Path to the tasks JSON file
+            storage: Storage mode ("json", "journal" or "sqlite"); defaults to the
+                TASK_STORAGE environment variable, then "json"
+        """
         self.tasks_file = tasks_file
         self.scheduler_thread = None
         self.running = False
-        self.scheduled_reminders = set()  # Track already scheduled reminders
         
-        # Ensure tasks file exists
-        if not os.path.exists(tasks_file):
-            with open(tasks_file, "w") as f:
-                json.dump([], f)
+        # Tasks are loaded once and served from memory
+        self.store = open_task_store(tasks_file, storage or os.environ.get('TASK_STORAGE', 'json'))
+        
+        # Pending reminders, fired by their own thread at the exact time and
+        # kept in a durable queue next to the tasks so restarts resume them
+        reminders_file = os.path.splitext(tasks_file)[0] + "_reminders.db"
+        self.reminders = ReminderDispatcher(self._send_reminders, ReminderQueue(reminders_file))
+        
+        # Expired tasks move here instead of being deleted
+        self.archive = TaskArchive(os.path.splitext(tasks_file)[0] + "_archive")
+        self._reminders_etag = None
+        
+        # Recurring jobs run in their own worker pools, so a hung network
+        # call in one can't stall the others or the scheduler loop
+        self.jobs = JobExecutor()
+        for name, timeout in JOB_TIMEOUTS.items():
+            self.jobs.register(name, getattr(self, '_' + name), timeout)
+        
+        # With several app workers only the lease holder runs the schedule;
+        # the others stand by and take over if it dies
+        self.lease = LeaderLease(tasks_file + ".leader", self._start_leading, self._stop_leading)
     
     def start(self):
-        """Start the scheduler in a background thread."""
+        """Start the scheduler once this process holds the leader lease."""
         if self.scheduler_thread and self.scheduler_thread.is_alive():
             print("Scheduler already running")
             return
-            
+        
+        self.lease.start()
+    
+    def stop(self):
+        """Stop the scheduler and give up the leader lease."""
+        self.lease.stop()
+    
+    @property
+    def is_leader(self) -> bool:
+        """Whether this process currently runs the schedule."""
+        return self.lease.is_leader
+    
+    def _start_leading(self):
+        """Start the scheduler in a background thread after being elected."""
         self.running = True
+        # Resume from the stored queue; writers keep it current, so tasks
+        # only need a full scan the first time the queue is created
+        self.reminders.load()
+        self.reminders.start()
+        self.jobs.start()
+        if self.reminders.queue.is_new:
+            self._sync_reminders()
+        else:
+            self._reminders_etag = self.store.snapshot().etag
         self.scheduler_thread = threading.Thread(target=self._run_scheduler)
         self.scheduler_thread.daemon = True  # Thread will exit when main program exits
         self.scheduler_thread.start()
         print("Task scheduler started")
     
-    def stop(self):
-        """Stop the scheduler."""
+    def _stop_leading(self):
+        """Stop the scheduler threads when giving up leadership."""
         self.running = False
+        self.reminders.stop()
+        self.jobs.shutdown()
+        # The jobs are registered again if this process is re-elected
+        schedule.clear()
         if self.scheduler_thread:
             self.scheduler_thread.join(timeout=1.0)
         print("Task scheduler stopped")
@@ -49,156 +120,222 @@ class TaskScheduler:
         # Schedule recurring jobs
         
         # Check for approaching task deadlines every hour
-        schedule.every(1).hour.do(self._check_approaching_tasks)
+        schedule.every(1).hour.do(self.jobs.submit, 'check_approaching_tasks')
         
         # Check for new tasks from email every 2 hours
-        schedule.every(2).hours.do(self._import_tasks_from_email)
+        schedule.every(2).hours.do(self.jobs.submit, 'import_tasks_from_email')
         
         # Sync with Google Calendar every 3 hours
-        schedule.every(3).hours.do(self._sync_with_calendar)
+        schedule.every(3).hours.do(self.jobs.submit, 'sync_with_calendar')
         
-        # Daily cleanup at 1 AM
-        schedule.every().day.at("01:00").do(self._cleanup_old_tasks)
+        # Archive expired tasks a few at a time, every hour
+        schedule.every(1).hour.do(self.jobs.submit, 'cleanup_old_tasks')
         
-        # Run the scheduler loop
+        # Run the scheduler loop; jobs only get submitted here, never run inline
         while self.running:
-            schedule.run_pending()
-            
-            # Also check for immediate tasks (run more frequently)
-            self._schedule_immediate_reminders()
+            idle = None
+            try:
+                schedule.run_pending()
+                self.jobs.check_timeouts()
+                
+                # Pick up task changes made by other processes; local changes
+                # reach the reminder dispatcher immediately
+                self._sync_reminders()
+                
+                # Retry reminders claimed by a worker that died, e.g. the
+                # previous leader just before this process took over
+                self.reminders.release_stale_claims()
+                
+                idle = schedule.idle_seconds()
+            except Exception as e:
+                # Keep the loop alive: this process still holds the leader
+                # lease, so no standby would take over if the thread died
+                logging.warning(f"Error in scheduler loop: {str(e)}")
             
-            # Sleep for a bit to avoid overloading the CPU
-            time.sleep(60)  # Check every minute
+            # Sleep until the next job is due, but poll for task changes
+            time.sleep(max(1, min(idle if idle is not None else REMINDER_SYNC_SECONDS, REMINDER_SYNC_SECONDS)))
     
     def _check_approaching_tasks(self):
         """Check for tasks approaching their deadlines and send reminders."""
-        tasks = self.get_all_tasks()
         now = datetime.now()
         
-        # Look for tasks within the next 24 hours that haven't had reminders sent
-        for task in tasks:
-            # Skip tasks without dates or that have already been reminded
-            if 'date' not in task or task.get('reminded', False):
+        now_ts = to_timestamp(now)
+        
+        due = []
+        
+        # Look for tasks within the next 24 hours that haven't had reminders sent;
+        # recurring tasks are checked per occurrence
+        end = now + timedelta(days=1)
+        tasks = [task for task in self.store.find_by_date_range(now, end) if not is_recurring(task)]
+        for task in self._merge_by_date(tasks, self.get_occurrences(now, end, include_completed=False)):
+            # Skip tasks that have already been reminded
+            if task.get('reminded', False) or 'id' not in task:
                 continue
                 
-            try:
-                task_date = datetime.fromisoformat(task['date'].replace('Z', '+00:00'))
-                
-                # Use a naive datetime for both for comparison
-                task_date_naive = task_date.replace(tzinfo=None)
-                now_naive = now.replace(tzinfo=None)
-                
-                time_until = task_date_naive - now_naive
-                
-                # If task is within the next day but more than 30 minutes away
-                if timedelta(0) < time_until < timedelta(days=1):
-                    # Send reminder based on priority
-                    if task['priority'] == 'high' or time_until < timedelta(hours=2):
-                        print(f"Sending reminder for high priority task: {task['description']}")
-                        send_email_reminder(task)
-                        
-                        # Update task to mark as reminded
-                        task['reminded'] = True
-                        self.update_task(task)
-            except Exception as e:
-                logging.warning(f"Error processing task reminder: {str(e)}")
+            # Send reminder based on priority
+            if task.get('priority') == 'high' or task_timestamp(task) - now_ts < 2 * 3600:
+                print(f"Sending reminder for high priority task: {task['description']}")
+                due.append(task)
+        
+        if not due:
+            return
+        
+        try:
+            # One SMTP session, one digest per recipient
+            results = send_reminder_batch(due)
+            
+            # Mark the sent ones as reminded without overwriting concurrent
+            # edits; the others are retried on the next run
+            with self.store.batch():
+                for task, sent in zip(due, results):
+                    if not sent:
+                        continue
+                    if 'occurrence_of' in task:
+                        self._mark_occurrence_reminded(task['occurrence_of'], task['occurrence_date'], now)
+                    else:
+                        self.store.patch(task['id'], {'reminded': True})
+            
+            failed = results.count(False)
+            if failed:
+                raise RuntimeError(f"{failed} of {len(due)} reminders could not be sent")
+        except Exception as e:
+            logging.warning(f"Error processing task reminder: {str(e)}")
+            # Let the job executor count the failure
+            raise
+    
+    def _mark_occurrence_reminded(self, task_id: str, occurrence_date: str, now: datetime):
+        """Record a reminder for one occurrence in the series' overrides."""
+        task = self.store.get(task_id)
+        if not task:
+            return
+        overrides = dict(task.get('recurrence_overrides') or {})
+        overrides[occurrence_date] = dict(overrides.get(occurrence_date) or {}, reminded=True)
+        # Overrides that only record a past reminder are no longer needed
+        cutoff = now - timedelta(days=1)
+        for key, changes in list(overrides.items()):
+            if changes == {'reminded': True} and (parse_task_date(key) or now) < cutoff:
+                del overrides[key]
+        self.store.patch(task_id, {'recurrence_overrides': overrides})
     
-    def _schedule_immediate_reminders(self):
-        """Schedule reminders for tasks happening very soon."""
+    def _sync_reminders(self):
+        """Bring pending reminders up to date if the tasks changed (in any process)."""
+        snapshot = self.store.snapshot()
+        if snapshot.etag == self._reminders_etag:
+            return
+        self._reminders_etag = snapshot.etag
+        tasks = [task for task in snapshot.find_by_date_range(datetime.now(), None, include_completed=False)
+                 if not is_recurring(task)]
+        for task in snapshot.recurring():
+            record = self._reminder_record(task)
+            if record is not None:
+                tasks.append(record)
+        self.reminders.sync(tasks)
+    
+    def _reminder_record(self, task: Task) -> Optional[Task]:
+        """
+        Return the record a task's next reminder is for.
+        
+        For a recurring task this is its next occurrence whose reminder
+        hasn't gone out yet (under the series ID), or None if there is none.
+        """
+        if not is_recurring(task):
+            return task
+        for occurrence in next_occurrences(task, datetime.now(), limit=2):
+            record = Task.from_dict(dict(occurrence, id=task['id']))
+            if not self.reminders.queue.is_done(task['id'], record.date_ts - self.reminders.lead_seconds):
+                return record
+        return None
+    
+    def _task_changed(self, task_data: Dict[str, Any]):
+        """Reschedule a task's reminder right after a local write."""
         try:
-            tasks = self.get_all_tasks()
-            now = datetime.now()
+            record = self._reminder_record(Task.from_dict(task_data))
+            if record is not None:
+                self.reminders.schedule(record)
+            elif 'id' in task_data:
+                self.reminders.cancel(task_data['id'])
+        except Exception as e:
+            logging.warning(f"Error scheduling reminder: {str(e)}")
+    
+    def _send_reminders(self, task_ids: List[str]) -> List[str]:
+        """
+        Send reminders for tasks (or recurring tasks' next occurrences) about to start.
+        
+        Reminders for the same recipient go out as one digest email, all
+        over a single SMTP session.
+        
+        Args:
+            task_ids: IDs of the tasks whose reminders are due
             
-            # Look for tasks within the next 30 minutes
-            for task in tasks:
-                # Skip tasks without dates
-                if 'date' not in task:
+        Returns:
+            IDs of the tasks whose reminder could not be sent
+        """
+        ids, tasks, series = [], [], []
+        now = datetime.now()
+        for task_id in task_ids:
+            task = self.store.get(task_id)
+            if not task or task.get('completed', False):
+                continue
+            if is_recurring(task):
+                series.append(task)
+                occurrences = next_occurrences(task, now)
+                if not occurrences:
                     continue
-                    
-                try:
-                    task_id = task.get('id', str(hash(json.dumps(task, sort_keys=True))))
-                    
-                    # Skip if already scheduled
-                    if task_id in self.scheduled_reminders:
-                        continue
-                    
-                    # Fix datetime handling to avoid timezone issues
-                    try:
-                        # Convert to naive datetimes for comparison
-                        task_date_str = task['date'].replace('Z', '+00:00')
-                        task_date = datetime.fromisoformat(task_date_str)
-                        task_date_naive = task_date.replace(tzinfo=None)
-                        now_naive = now.replace(tzinfo=None)
-                        
-                        time_until = task_date_naive - now_naive
-                        
-                        # If task is within 30 minutes
-                        if timedelta(0) < time_until < timedelta(minutes=30):
-                            # Schedule exact reminder
-                            reminder_time = now + (time_until - timedelta(minutes=15))
-                            delay_seconds = max(0, (reminder_time - now).total_seconds())
-                            
-                            if delay_seconds > 0:
-                                # Schedule reminder
-                                def send_reminder(task_obj):
-                                    print(f"Sending immediate reminder for: {task_obj['description']}")
-                                    send_email_reminder(task_obj)
-                                    if task_id in self.scheduled_reminders:
-                                        self.scheduled_reminders.remove(task_id)
-                                
-                                # Use threading to schedule the reminder
-                                threading.Timer(
-                                    delay_seconds, 
-                                    send_reminder, 
-                                    args=[task]
-                                ).start()
-                                
-                                # Mark as scheduled
-                                self.scheduled_reminders.add(task_id)
-                                print(f"Scheduled reminder for task in {delay_seconds//60} minutes: {task['description']}")
-                    except Exception as inner_e:
-                        # Just log instead of printing to console
-                        logging.warning(f"Error in time calculation: {str(inner_e)}")
-                        continue
-                
-                except Exception as e:
-                    logging.warning(f"Error scheduling task: {str(e)}")
-        except Exception as outer_e:
-            logging.warning(f"Error in scheduler main loop: {str(outer_e)}")
+                task = occurrences[0]
+            print(f"Sending immediate reminder for: {task['description']}")
+            ids.append(task_id)
+            tasks.append(task)
         
-        # Return normally to avoid blocking the main thread
-        return
+        try:
+            results = send_reminder_batch(tasks) if tasks else []
+        finally:
+            # Line up the reminders for the following occurrences
+            for task in series:
+                self._task_changed(task)
+        return [task_id for task_id, sent in zip(ids, results) if not sent]
     
     def _import_tasks_from_email(self):
         """Import tasks from email messages."""
         try:
-            email_tasks = scan_inbox_for_tasks()
+            try:
+                email_tasks, scan_error = scan_inbox_for_tasks(), None
+            except InboxScanError as e:
+                # Messages read before the failure are already marked as seen;
+                # import their tasks before reporting the error
+                email_tasks, scan_error = e.tasks, e
             
             if email_tasks:
                 print(f"Found {len(email_tasks)} tasks from email")
                 
                 for task in email_tasks:
                     # Generate a unique ID for the task
-                    task['id'] = f"email_{int(time.time())}_{hash(task['description'])}"
+                    task['id'] = new_task_id()
                     task['source'] = 'email'
-                    
-                    # Save the task
-                    self.add_task(task)
-                    
-                    # If it's an event, also add to Google Calendar
+                
+                # Save all tasks with a single write
+                self.add_tasks(email_tasks)
+                
+                # If it's an event, also add to Google Calendar
+                linked_tasks = []
+                for task in email_tasks:
                     if task['type'] == 'event':
                         try:
                             event_id = create_calendar_event(task)
                             if event_id:
                                 task['calendar_event_id'] = event_id
-                                self.update_task(task)
+                                linked_tasks.append(task)
                         except:
                             pass  # Calendar integration is optional
+                
+                if linked_tasks:
+                    self.update_tasks(linked_tasks)
             
+            if scan_error is not None:
+                raise scan_error
             return len(email_tasks)
         except Exception as e:
             print(f"Error importing tasks from email: {str(e)}")
-            return 0
+            raise
     
     def _sync_with_calendar(self):
         """Sync tasks with Google Calendar."""
@@ -219,12 +356,12 @@ class TaskScheduler:
                     existing_event_ids.add(task['calendar_event_id'])
             
             # Add new events from calendar that aren't in tasks yet
-            new_count = 0
+            new_tasks = []
             for event in calendar_events:
                 if event['event_id'] not in existing_event_ids:
                     # Convert to task format
                     task = {
-                        'id': f"calendar_{int(time.time())}_{hash(event['description'])}",
+                        'id': new_task_id(),
                         'type': 'event',
                         'description': event['description'],
                         'date': event['date'],
@@ -234,55 +371,68 @@ class TaskScheduler:
                         'calendar_event_id': event['event_id'],
                         'source': 'google_calendar'
                     }
-                    
-                    # Save the task
-                    self.add_task(task)
-                    new_count += 1
+                    new_tasks.append(task)
+                    existing_event_ids.add(event['event_id'])
             
-            return new_count
+            # Save all new tasks with a single write
+            self.add_tasks(new_tasks)
+            
+            return len(new_tasks)
         except Exception as e:
             print(f"Error syncing with Google Calendar: {str(e)}")
-            return 0
+            raise
     
     def _cleanup_old_tasks(self):
-        """Clean up completed and old tasks."""
-        tasks = self.get_all_tasks()
+        """Move expired tasks to the archive, at most CLEANUP_BATCH_SIZE per run."""
         now = datetime.now()
-        updated_tasks = []
-        
-        for task in tasks:
-            # Keep task if:
-            # 1. It's completed and less than 30 days old
-            # 2. It's not completed and not more than 7 days in the past
-            # 3. It doesn't have a date (persistent task)
-            
-            if 'date' not in task:
-                # Keep undated tasks
-                updated_tasks.append(task)
+        month_ago = now - timedelta(days=30)
+        snapshot = self.store.snapshot()
+        
+        # A task expires if:
+        # 1. It's completed and more than 30 days old
+        # 2. It's not completed and more than 7 days in the past
+        # Undated tasks, tasks with unparseable dates and active recurring
+        # series are kept. The date index yields exactly these ranges, so
+        # only expired tasks are touched, oldest first.
+        candidates = itertools.chain(
+            snapshot.find_by_date_range(None, month_ago),
+            snapshot.find_by_date_range(month_ago, now - timedelta(days=7), include_completed=False))
+        candidate_ids = []
+        for task in candidates:
+            if 'id' not in task or not self._is_expired(task, now):
                 continue
-                
-            try:
-                task_date = datetime.fromisoformat(task['date'].replace('Z', '+00:00'))
-                task_date_naive = task_date.replace(tzinfo=None)
-                now_naive = now.replace(tzinfo=None)
-                
-                if task.get('completed', False):
-                    # For completed tasks, keep for 30 days
-                    if now_naive - task_date_naive < timedelta(days=30):
-                        updated_tasks.append(task)
-                else:
-                    # For incomplete tasks, keep if not more than 7 days in the past
-                    if task_date_naive > now_naive - timedelta(days=7):
-                        updated_tasks.append(task)
-            except:
-                # If date parsing fails, keep the task
-                updated_tasks.append(task)
+            candidate_ids.append(task['id'])
+            if len(candidate_ids) >= CLEANUP_BATCH_SIZE:
+                break
         
-        # Save the filtered tasks
-        with open(self.tasks_file, "w") as f:
-            json.dump(updated_tasks, f, indent=2)
+        expired = []
+        with self.store.batch():
+            # The snapshot may be stale: re-check each task under the store's
+            # lock so one edited or reopened meanwhile (by any process) is kept
+            for task_id in candidate_ids:
+                task = self.store.get(task_id)
+                if task is not None and self._is_expired(task, now):
+                    expired.append(task)
+            
+            # Archive first: if we stop in between, the next run archives the
+            # same tasks again and history queries skip the duplicates
+            self.archive.append(expired)
+            for task in expired:
+                self.store.delete(task['id'])
+        
+        # Forget delivery records of reminders that are long past
+        self.reminders.queue.prune(to_timestamp(now - timedelta(days=7)))
             
-        return len(tasks) - len(updated_tasks)  # Return number of removed tasks
+        return len(expired)  # Return number of archived tasks
+    
+    def _is_expired(self, task: Dict[str, Any], now: datetime) -> bool:
+        """Return True if the task is old enough to be archived (see _cleanup_old_tasks)."""
+        date = parse_task_date(task.get('date'))
+        if date is None:
+            return False
+        if task.get('completed', False):
+            return date < now - timedelta(days=30)
+        return not is_recurring(task) and date < now - timedelta(days=7)
     
     def add_task(self, task_data: Dict[str, Any]) -> str:
         """
@@ -294,21 +444,16 @@ class TaskScheduler:
         Returns:
             Task ID
         """
-        tasks = self.get_all_tasks()
-        
         # Generate ID if not present
         if 'id' not in task_data:
-            task_data['id'] = f"task_{int(time.time())}_{hash(task_data['description'])}"
+            task_data['id'] = new_task_id()
         
         # Add creation timestamp
         task_data['created_at'] = datetime.now().isoformat()
         
-        # Add to tasks list
-        tasks.append(task_data)
-        
-        # Save to file
-        with open(self.tasks_file, "w") as f:
-            json.dump(tasks, f, indent=2)
+        # Add to store (written through to disk)
+        self.store.add(task_data)
+        self._task_changed(task_data)
             
         return task_data['id']
     
@@ -325,64 +470,216 @@ class TaskScheduler:
         if 'id' not in task_data:
             return False
             
-        tasks = self.get_all_tasks()
-        
-        # Find and update the task
-        found = False
-        for i, task in enumerate(tasks):
-            if 'id' in task and task['id'] == task_data['id']:
-                # Update the task
-                tasks[i] = task_data
-                found = True
-                break
-        
-        if not found:
+        if not self.store.update(task_data):
             return False
+        self._task_changed(task_data)
+        return True
+    
+    def edit_task(self, task_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Change some fields of a task, or of one occurrence of a recurring task.
         
-        # Save to file
-        with open(self.tasks_file, "w") as f:
-            json.dump(tasks, f, indent=2)
+        Args:
+            task_id: ID of the task, or an occurrence ID
+            changes: Fields to change; 'id' and None values are ignored
             
-        return True
+        Returns:
+            The updated task or occurrence, or None if not found
+        """
+        with self.store.batch():
+            return self._edit(task_id, changes)
+    
+    def _edit(self, task_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply edit_task's changes; callers hold a store batch."""
+        changes = {key: value for key, value in changes.items() if key != 'id' and value is not None}
+        task = self.store.get(task_id)
+        if task is not None:
+            task.update(changes)
+            self.update_task(task)
+            return task
+        
+        # Editing one occurrence of a recurring task overrides just that occurrence
+        occurrence = split_occurrence_id(task_id)
+        if occurrence and self.override_occurrence(*occurrence, changes):
+            return self._get_occurrence(*occurrence)
+        return None
     
     def delete_task(self, task_id: str) -> bool:
         """
         Delete a task by ID.
         
         Args:
-            task_id: ID of the task to delete
+            task_id: ID of the task to delete, or an occurrence ID to cancel
             
         Returns:
             Boolean indicating success
         """
-        tasks = self.get_all_tasks()
+        return self.delete_tasks([task_id])[0]
+    
+    def add_tasks(self, tasks: List[Dict[str, Any]]) -> List[str]:
+        """
+        Add several tasks, persisting them with a single write.
         
-        # Find the task
-        task_to_delete = None
-        for task in tasks:
-            if 'id' in task and task['id'] == task_id:
-                task_to_delete = task
-                break
+        Args:
+            tasks: List of task details
+            
+        Returns:
+            List of task IDs, in the same order
+        """
+        with self.store.batch():
+            return [self.add_task(task_data) for task_data in tasks]
+    
+    def update_tasks(self, tasks: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Update several tasks, persisting them with a single write.
         
-        if not task_to_delete:
-            return False
+        Args:
+            tasks: List of updated task details with IDs
+            
+        Returns:
+            List of booleans indicating success for each task
+        """
+        with self.store.batch():
+            return [self.update_task(task_data) for task_data in tasks]
+    
+    def delete_tasks(self, task_ids: List[str]) -> List[bool]:
+        """
+        Delete several tasks, persisting the removal with a single write.
+        
+        Args:
+            task_ids: IDs of the tasks to delete, or occurrence IDs to cancel
             
-        # Try to delete from Google Calendar if it's a calendar event
-        if 'calendar_event_id' in task_to_delete:
+        Returns:
+            List of booleans indicating success for each ID
+        """
+        removed = []
+        with self.store.batch():
+            results = [self._remove(task_id, removed) for task_id in task_ids]
+        
+        # Done after the store write so network calls don't hold the lock
+        self._delete_calendar_events(removed)
+        
+        return results
+    
+    def _remove(self, task_id: str, removed: List[Dict[str, Any]]) -> bool:
+        """
+        Delete a task, or cancel one occurrence of a recurring task; callers hold a store batch.
+        
+        Args:
+            task_id: ID of the task, or an occurrence ID
+            removed: Deleted tasks are appended here, to remove their calendar events later
+            
+        Returns:
+            Boolean indicating success
+        """
+        task = self.store.delete(task_id)
+        if task is not None:
+            removed.append(task)
+            self.reminders.cancel(task_id)
+            return True
+        
+        # Deleting one occurrence of a recurring task cancels just that occurrence
+        occurrence = split_occurrence_id(task_id)
+        return bool(occurrence) and self.cancel_occurrence(*occurrence)
+    
+    def sync_calendar_events(self, tasks: List[Dict[str, Any]]):
+        """
+        Create or update the Google Calendar events of the given tasks.
+        
+        New event IDs are stored on the tasks. Occurrences are skipped, as
+        their series' event covers them. Call this after the store write so
+        network calls don't hold the lock.
+        
+        Args:
+            tasks: Tasks that were created or changed
+        """
+        created = []
+        for task in tasks:
+            if 'occurrence_of' in task:
+                continue
             try:
-                from google_calendar import delete_calendar_event
-                delete_calendar_event(task_to_delete['calendar_event_id'])
-            except:
-                pass  # Calendar integration is optional
+                if 'calendar_event_id' in task:
+                    from google_calendar import update_calendar_event
+                    update_calendar_event(task['calendar_event_id'], task)
+                else:
+                    calendar_event_id = create_calendar_event(task)
+                    if calendar_event_id:
+                        task['calendar_event_id'] = calendar_event_id
+                        created.append(task)
+            except Exception as e:
+                print(f"Calendar sync error: {str(e)}")  # Calendar integration is optional
+        
+        # Only the new field is written, so edits made meanwhile are kept
+        if created:
+            with self.store.batch():
+                for task in created:
+                    self.store.patch(task['id'], {'calendar_event_id': task['calendar_event_id']})
+    
+    def _delete_calendar_events(self, tasks: List[Dict[str, Any]]):
+        """Delete the Google Calendar events linked to the given tasks."""
+        for task in tasks:
+            if 'calendar_event_id' in task:
+                try:
+                    from google_calendar import delete_calendar_event
+                    delete_calendar_event(task['calendar_event_id'])
+                except:
+                    pass  # Calendar integration is optional
+    
+    def apply_bulk(self, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply a list of create/update/delete operations with a single write.
         
-        # Remove from tasks list
-        tasks = [task for task in tasks if task.get('id') != task_id]
+        Each operation is a dict with an 'op' of "create" (with 'task'),
+        "update" (with 'id' and the changed fields in 'task') or "delete"
+        (with 'id'). Operations are applied in order, like the single-task
+        calls; occurrence IDs edit or cancel one occurrence.
         
-        # Save to file
-        with open(self.tasks_file, "w") as f:
-            json.dump(tasks, f, indent=2)
+        Args:
+            operations: List of operations
             
-        return True
+        Returns:
+            List of per-operation results with 'op', 'id' and 'status'
+        """
+        results = []
+        changed = []
+        removed = []
+        
+        with self.store.batch():
+            for operation in operations:
+                op = operation.get('op')
+                task_id = operation.get('id')
+                result = {'op': op, 'id': task_id, 'status': 'success'}
+                
+                try:
+                    if op == 'create':
+                        task = dict(operation.get('task') or {})
+                        result['id'] = self.add_task(task)
+                        changed.append(task)
+                    elif op == 'update':
+                        task = self._edit(task_id, operation.get('task') or {}) if task_id else None
+                        if task:
+                            changed.append(task)
+                        else:
+                            result.update(status='error', detail='Task not found')
+                    elif op == 'delete':
+                        if not (task_id and self._remove(task_id, removed)):
+                            result.update(status='error', detail='Task not found')
+                    else:
+                        result.update(status='error', detail=f"Unknown operation: {op}")
+                except Exception as e:
+                    result.update(status='error', detail=str(e))
+                
+                results.append(result)
+        
+        # Sync Google Calendar outside the store lock, once per task in its
+        # final state; a task deleted later in the batch gets no event
+        latest = {task['id']: task for task in changed}
+        for task in removed:
+            latest.pop(task['id'], None)
+        self.sync_calendar_events(list(latest.values()))
+        self._delete_calendar_events(removed)
+        
+        return results
     
     def complete_task(self, task_id: str) -> bool:
         """
@@ -394,22 +691,60 @@ class TaskScheduler:
         Returns:
             Boolean indicating success
         """
-        tasks = self.get_all_tasks()
+        changes = {
+            'completed': True,
+            'completed_at': datetime.now().isoformat()
+        }
+        
+        # Mark as completed, changing only these fields
+        if self.store.patch(task_id, changes) is None:
+            # Completing one occurrence of a recurring task
+            occurrence = split_occurrence_id(task_id)
+            return bool(occurrence) and self.override_occurrence(*occurrence, changes)
+        self.reminders.cancel(task_id)
+        return True
+    
+    def override_occurrence(self, task_id: str, occurrence_date: str,
+                            changes: Optional[Dict[str, Any]]) -> bool:
+        """
+        Change or cancel a single occurrence of a recurring task.
         
-        # Find the task
-        for task in tasks:
-            if 'id' in task and task['id'] == task_id:
-                # Mark as completed
-                task['completed'] = True
-                task['completed_at'] = datetime.now().isoformat()
-                
-                # Save to file
-                with open(self.tasks_file, "w") as f:
-                    json.dump(tasks, f, indent=2)
-                    
-                return True
+        Args:
+            task_id: ID of the recurring task
+            occurrence_date: Original ISO date of the occurrence
+            changes: Fields to override for this occurrence, or None to cancel it
+            
+        Returns:
+            Boolean indicating success
+        """
+        occurrence = parse_task_date(occurrence_date)
+        if occurrence is None:
+            return False
+        key = occurrence.isoformat()
+        
+        with self.store.batch():
+            task = self.store.get(task_id)
+            if not task or not is_recurring(task):
+                return False
+            overrides = dict(task.get('recurrence_overrides') or {})
+            overrides[key] = None if changes is None else dict(overrides.get(key) or {}, **changes)
+            task = self.store.patch(task_id, {'recurrence_overrides': overrides})
+        
+        self._task_changed(task)
+        return True
+    
+    def cancel_occurrence(self, task_id: str, occurrence_date: str) -> bool:
+        """
+        Cancel a single occurrence of a recurring task.
         
-        return False
+        Args:
+            task_id: ID of the recurring task
+            occurrence_date: Original ISO date of the occurrence
+            
+        Returns:
+            Boolean indicating success
+        """
+        return self.override_occurrence(task_id, occurrence_date, None)
     
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -421,13 +756,16 @@ class TaskScheduler:
         Returns:
             Task dictionary or None if not found
         """
-        tasks = self.get_all_tasks()
-        
-        for task in tasks:
-            if 'id' in task and task['id'] == task_id:
-                return task
-        
-        return None
+        return self.store.get(task_id)
+    
+    def _get_occurrence(self, task_id: str, occurrence_date: str) -> Optional[Dict[str, Any]]:
+        """Get one occurrence of a recurring task with its override applied, or None."""
+        task = self.store.get(task_id)
+        occurrence = parse_task_date(occurrence_date)
+        if task is None or occurrence is None:
+            return None
+        occurrences = expand(task, occurrence, occurrence + timedelta(seconds=1))
+        return occurrences[0] if occurrences else None
     
     def get_all_tasks(self) -> List[Dict[str, Any]]:
         """
@@ -436,15 +774,7 @@ class TaskScheduler:
         Returns:
             List of all tasks
         """
-        if not os.path.exists(self.tasks_file):
-            return []
-            
-        try:
-            with open(self.tasks_file, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Error decoding {self.tasks_file}, returning empty list")
-            return []
+        return self.store.all()
     
     def get_tasks_by_date(self, date: datetime) -> List[Dict[str, Any]]:
         """
@@ -456,20 +786,10 @@ class TaskScheduler:
         Returns:
             List of tasks on the specified date
         """
-        date_str = date.strftime('%Y-%m-%d')
-        tasks = self.get_all_tasks()
-        result = []
-        
-        for task in tasks:
-            if 'date' in task:
-                try:
-                    task_date = datetime.fromisoformat(task['date'].replace('Z', '+00:00'))
-                    if task_date.strftime('%Y-%m-%d') == date_str:
-                        result.append(task)
-                except:
-                    pass
-        
-        return result
+        day_start = datetime(date.year, date.month, date.day)
+        day_end = day_start + timedelta(days=1)
+        tasks = [task for task in self.store.find_by_date_range(day_start, day_end) if not is_recurring(task)]
+        return self._merge_by_date(tasks, self.get_occurrences(day_start, day_end))
     
     def get_tasks_by_criteria(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
@@ -481,80 +801,123 @@ class TaskScheduler:
         Returns:
             List of matching tasks
         """
-        tasks = self.get_all_tasks()
-        result = []
+        return self.store.find(criteria)
+    
+    def count_tasks_by_criteria(self, criteria: Dict[str, Any]) -> int:
+        """
+        Count tasks matching specified criteria without returning them.
         
-        for task in tasks:
-            matches = True
-            for key, value in criteria.items():
-                if key not in task or task[key] != value:
-                    matches = False
-                    break
+        Args:
+            criteria: Dictionary of fields to match
             
-            if matches:
-                result.append(task)
+        Returns:
+            Number of matching tasks
+        """
+        return self.store.count(criteria)
+    
+    def get_snapshot(self) -> TaskSnapshot:
+        """
+        Get an immutable, versioned snapshot of all tasks.
         
-        return result
+        Readers get a consistent view without blocking writers. Tasks in
+        the snapshot are shared and must not be modified.
+        
+        Returns:
+            Current TaskSnapshot
+        """
+        return self.store.snapshot()
+    
+    def get_recent_tasks(self, limit: int = 20, before: Optional[str] = None,
+                         snapshot: Optional[TaskSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recently created tasks, newest first.
+        
+        Args:
+            limit: Maximum number of tasks
+            before: ID of the last task of the previous page, or None for the first page
+            snapshot: Read from this snapshot instead of the live store
+            
+        Returns:
+            List of tasks, newest first
+        """
+        # The store answers from its creation index (an indexed query in SQLite)
+        source = snapshot or self.store
+        return [task.to_dict() if isinstance(task, Task) else task
+                for task in source.find_recent(limit, before)]
     
-    def get_upcoming_tasks(self, days: int = 7) -> List[Dict[str, Any]]:
+    def get_upcoming_tasks(self, days: int = 7, snapshot: Optional[TaskSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Get tasks scheduled for the next N days.
         
         Args:
             days: Number of days to look ahead
+            snapshot: Read from this snapshot instead of the live store
             
         Returns:
-            List of upcoming tasks
+            List of upcoming tasks, sorted by date
         """
         now = datetime.now()
-        end_date = now + timedelta(days=days)
-        tasks = self.get_all_tasks()
-        result = []
-        
-        for task in tasks:
-            if 'date' in task and not task.get('completed', False):
-                try:
-                    task_date = datetime.fromisoformat(task['date'].replace('Z', '+00:00'))
-                    # Make both naive for comparison
-                    task_date_naive = task_date.replace(tzinfo=None)
-                    now_naive = now.replace(tzinfo=None)
-                    end_date_naive = end_date.replace(tzinfo=None)
-                    
-                    if now_naive <= task_date_naive <= end_date_naive:
-                        result.append(task)
-                except:
-                    pass
-        
-        # Sort by date
-        result.sort(key=lambda x: x['date'])
-        
-        return result
+        end = now + timedelta(days=days)
+        source = snapshot or self.store
+        # Recurring tasks are listed by occurrence, expanded for this window only
+        tasks = [task for task in source.find_by_date_range(now, end, include_completed=False)
+                 if not is_recurring(task)]
+        return self._merge_by_date(tasks, self.get_occurrences(now, end, snapshot, include_completed=False))
     
-    def get_overdue_tasks(self) -> List[Dict[str, Any]]:
+    def get_overdue_tasks(self, snapshot: Optional[TaskSnapshot] = None) -> List[Dict[str, Any]]:
         """
         Get tasks that are overdue (past their due date).
         
+        Args:
+            snapshot: Read from this snapshot instead of the live store
+            
         Returns:
-            List of overdue tasks
+            List of overdue tasks, oldest first
         """
-        now = datetime.now()
-        tasks = self.get_all_tasks()
-        result = []
-        
-        for task in tasks:
-            if 'date' in task and not task.get('completed', False):
-                try:
-                    task_date = datetime.fromisoformat(task['date'].replace('Z', '+00:00'))
-                    # Make both naive for comparison
-                    task_date_naive = task_date.replace(tzinfo=None)
-                    now_naive = now.replace(tzinfo=None)
-                    
-                    if task_date_naive < now_naive:
-                        result.append(task)
-                except:
-                    pass
+        source = snapshot or self.store
+        # A recurring task's start date passing doesn't make the series overdue
+        return [task for task in source.find_by_date_range(None, datetime.now(), include_completed=False)
+                if not is_recurring(task)]
+    
+    def get_occurrences(self, start: datetime, end: datetime, snapshot: Optional[TaskSnapshot] = None,
+                        include_completed: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get the occurrences of recurring tasks in a time window.
         
-        # Sort by date (oldest first)
-        result.sort(key=lambda x: x['date'])
+        Args:
+            start: Window start
+            end: Window end (exclusive)
+            snapshot: Read from this snapshot instead of the current one
+            include_completed: Include occurrences that were completed
+            
+        Returns:
+            List of occurrence dictionaries, sorted by date
+        """
+        occurrences = []
+        # Only the recurring series are read, via an index where the store has one
+        for task in (snapshot or self.store).find_recurring(include_completed=False):
+            occurrences.extend(expand(task, start, end, include_completed))
+        occurrences.sort(key=lambda occurrence: task_timestamp(occurrence) or 0)
+        return occurrences
+    
+    def get_task_history(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         criteria: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over archived (expired) tasks.
         
-        return result
\ No newline at end of file
+        Args:
+            start: Earliest task date, or None for no lower bound
+            end: Latest task date (exclusive), or None for no upper bound
+            criteria: Field values the tasks must have
+            
+        Returns:
+            Iterator over archived task dictionaries, oldest month first
+        """
+        return self.archive.query(start, end, criteria)
+    
+    def _merge_by_date(self, tasks: List[Any], occurrences: List[Dict[str, Any]]) -> List[Any]:
+        """Merge date-sorted tasks (dicts or Task records) with date-sorted occurrences."""
+        if not occurrences:
+            return tasks
+        date_key = lambda task: task.date_ts if isinstance(task, Task) else task_timestamp(task) or 0
+        return list(heapq.merge(tasks, occurrences, key=date_key))
@@ -0,0 +1,1334 @@
+import os
+import sys
+import bisect
+import heapq
+import json
+import math
+import sqlite3
+import uuid
+import itertools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterator
+
+from file_lock import FileLock
+from ids import TIME_LENGTH, id_floor, is_sortable_id
+from task_model import Task, parse_task_date, to_timestamp
+from recurrence import is_recurring
+
+# Snapshots share a frozen base and carry the changes made since; the
+# changes are folded into a new base once there are more than this many
+# (or sqrt(number of tasks), if that is larger)
+REBASE_MIN_CHANGES = 64
+
+
+def task_timestamp(task: Dict[str, Any]) -> Optional[float]:
+    """Return the task's date as a timestamp, or None if it has no valid date."""
+    task_date = parse_task_date(task.get('date'))
+    return to_timestamp(task_date) if task_date else None
+
+
+def creation_key(task) -> str:
+    """
+    Return a key that orders tasks by creation time.
+
+    Sortable IDs are their own key. Tasks with older, unsortable IDs get the
+    time prefix of their ``created_at`` so they interleave correctly.
+    """
+    task_id = task['id']
+    if is_sortable_id(task_id):
+        return task_id
+    created = parse_task_date(task.get('created_at'))
+    prefix = id_floor(created)[:TIME_LENGTH] if created else "0" * TIME_LENGTH
+    return f"{prefix}!{task_id}"
+
+
+class _SnapshotBase:
+    """Frozen copy of a store's tasks and indexes, shared by snapshots.
+
+    ``positions`` maps each key to its insertion sequence number, which
+    also orders the dict and breaks ties in the (timestamp, seq, key)
+    date index. ``creation_index`` holds sorted (creation_key, key) pairs.
+    """
+
+    def __init__(self, tasks: Dict[Any, Task], positions: Dict[Any, int],
+                 date_index: List[Tuple[float, int, Any]], creation_index: List[Tuple[str, Any]]):
+        self.tasks = tasks
+        self.positions = positions
+        self.date_index = date_index
+        self.creation_index = creation_index
+        self._all = None
+        self._recurring = None
+
+    def all(self) -> Tuple[Task, ...]:
+        """Return all tasks in insertion order (computed once)."""
+        if self._all is None:
+            self._all = tuple(self.tasks.values())
+        return self._all
+
+    def recurring_keys(self) -> List[Any]:
+        """Return the keys of the tasks that have a recurrence rule (computed once)."""
+        if self._recurring is None:
+            self._recurring = [key for key, task in self.tasks.items() if is_recurring(task)]
+        return self._recurring
+
+
+def _rebase_due(changes: Dict[Any, Any], size: int) -> bool:
+    """Whether enough changes piled up on a base of this size to fold them into a new one."""
+    # Folding costs O(n), so doing it every ~sqrt(n) commits keeps both
+    # publishing a snapshot and reading from it at O(sqrt(n)) per commit
+    return len(changes) > max(REBASE_MIN_CHANGES, math.isqrt(size))
+
+
+def _date_slice(date_index: List[Tuple[float, int, Any]], start: Optional[datetime],
+                end: Optional[datetime]) -> List[Tuple[float, int, Any]]:
+    """Return the date index entries with start <= timestamp < end."""
+    # (ts,) sorts before every (ts, seq, key) entry with the same ts
+    lo = bisect.bisect_left(date_index, (to_timestamp(start),)) if start else 0
+    hi = bisect.bisect_left(date_index, (to_timestamp(end),)) if end else len(date_index)
+    return date_index[lo:hi]
+
+
+class TaskSnapshot:
+    """Immutable, versioned view of all tasks.
+
+    Snapshots are published by the store after each committed write and
+    never change afterwards, so readers can use one without locking and
+    get a consistent view. Tasks are read-only Task records shared between
+    snapshots. ``version`` increases with every published snapshot;
+    ``etag`` also distinguishes store instances (processes).
+
+    A snapshot is a frozen base shared with other snapshots plus the
+    changes committed since (key -> (task, seq), task None if deleted), so
+    publishing one doesn't copy the whole task set.
+    """
+
+    def __init__(self, version: int, epoch: str, base: _SnapshotBase,
+                 changes: Dict[Any, Tuple[Optional[Task], int]]):
+        """Wrap a base and a private copy of the changes made on top of it."""
+        self.version = version
+        self.etag = f"{epoch}-{version}"
+        self._base = base
+        self._changes = changes
+        self._changed_dates = sorted((task.date_ts, seq, key) for key, (task, seq) in changes.items()
+                                     if task is not None and task.date_ts is not None)
+        self._changed_created = sorted((creation_key(task), key) for key, (task, _) in changes.items()
+                                       if task is not None and 'id' in task)
+        self._all = None
+        self._recurring = None
+
+    @property
+    def tasks(self) -> Tuple[Task, ...]:
+        """All tasks in insertion order (computed once per snapshot)."""
+        if self._all is None:
+            if not self._changes:
+                self._all = self._base.all()
+            else:
+                self._all = tuple(task for _, task, _ in self._items())
+        return self._all
+
+    def _items(self) -> Iterator[Tuple[Any, Task, int]]:
+        """Yield (key, task, seq) for every task in insertion order."""
+        changes = self._changes
+        positions = self._base.positions
+        for key, task in self._base.tasks.items():
+            if key in changes:
+                changed, seq = changes[key]
+                if changed is None or seq != positions[key]:
+                    # Deleted, or deleted and added again at the end
+                    continue
+                task = changed
+            yield key, task, positions[key]
+        added = sorted((seq, key) for key, (task, seq) in changes.items()
+                       if task is not None and positions.get(key) != seq)
+        for seq, key in added:
+            yield key, changes[key][0], seq
+
+    def _fold(self) -> _SnapshotBase:
+        """Return a new base with this snapshot's changes applied."""
+        tasks, positions = {}, {}
+        for key, task, seq in self._items():
+            tasks[key] = task
+            positions[key] = seq
+        # The indexes are sorted, so they merge in linear time
+        unchanged = (entry for entry in self._base.date_index if entry[2] not in self._changes)
+        date_index = list(heapq.merge(unchanged, self._changed_dates))
+        unchanged = (entry for entry in self._base.creation_index if entry[1] not in self._changes)
+        creation_index = list(heapq.merge(unchanged, self._changed_created))
+        return _SnapshotBase(tasks, positions, date_index, creation_index)
+
+    def recurring(self) -> Tuple[Task, ...]:
+        """Return the tasks that have a recurrence rule (computed once per snapshot)."""
+        if self._recurring is None:
+            base, changes = self._base, self._changes
+            entries = [(base.positions[key], base.tasks[key]) for key in base.recurring_keys()
+                       if key not in changes]
+            entries.extend((seq, task) for task, seq in changes.values()
+                           if task is not None and is_recurring(task))
+            entries.sort(key=lambda entry: entry[0])
+            self._recurring = tuple(task for _, task in entries)
+        return self._recurring
+
+    def get(self, task_id: str) -> Optional[Task]:
+        """Return the task with the given ID, or None."""
+        if task_id in self._changes:
+            return self._changes[task_id][0]
+        return self._base.tasks.get(task_id)
+
+    def find_recurring(self, include_completed: bool = True) -> List[Task]:
+        """Get the tasks that have a recurrence rule."""
+        return [task for task in self.recurring() if include_completed or not task.get('completed', False)]
+
+    def find_recent(self, limit: int, before: Optional[str] = None) -> List[Task]:
+        """
+        Get the most recently created tasks, newest first.
+
+        Args:
+            limit: Maximum number of tasks
+            before: Only tasks created before the task with this ID (a
+                pagination cursor); a deleted task's sortable ID still works
+
+        Returns:
+            List of tasks, newest first
+        """
+        base_index, changed_index = self._base.creation_index, self._changed_created
+        base_hi, changed_hi = len(base_index), len(changed_index)
+        if before is not None:
+            cursor = self.get(before)
+            if cursor is not None:
+                cursor_key = creation_key(cursor)
+            elif is_sortable_id(before):
+                cursor_key = before
+            else:
+                return []
+            base_hi = bisect.bisect_left(base_index, (cursor_key,))
+            changed_hi = bisect.bisect_left(changed_index, (cursor_key,))
+
+        # Walk both indexes backwards from the cursor; base entries of
+        # changed tasks are replaced by the changed ones
+        unchanged = (base_index[i] for i in range(base_hi - 1, -1, -1)
+                     if base_index[i][1] not in self._changes)
+        newest = heapq.merge(unchanged, reversed(changed_index[:changed_hi]), reverse=True)
+        return [self.get(key) for _, key in itertools.islice(newest, max(0, limit))]
+
+    def find_by_date_range(self, start: Optional[datetime], end: Optional[datetime],
+                           include_completed: bool = True) -> List[Task]:
+        """Get dated tasks with start <= date < end, sorted by date."""
+        entries = _date_slice(self._base.date_index, start, end)
+        if self._changes:
+            # Base entries of changed tasks are replaced by the changed ones
+            entries = heapq.merge([entry for entry in entries if entry[2] not in self._changes],
+                                  _date_slice(self._changed_dates, start, end))
+        result = []
+        for _, _, key in entries:
+            task = self.get(key)
+            if include_completed or not task.get('completed', False):
+                result.append(task)
+        return result
+
+
+class TaskStore:
+    """Base class for task storage backends.
+
+    Backends implement the basic CRUD methods. The query methods here are
+    plain scans over all tasks; backends override them with indexed
+    lookups where they can.
+    """
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return copies of all tasks in insertion order."""
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the task with the given ID, or None."""
+        raise NotImplementedError
+
+    def add(self, task: Dict[str, Any]):
+        """Store a new task."""
+        raise NotImplementedError
+
+    def update(self, task: Dict[str, Any]) -> bool:
+        """Replace the task with the same ID; return False if not found."""
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a task; return it, or None if not found."""
+        raise NotImplementedError
+
+    def replace_all(self, tasks: List[Dict[str, Any]]):
+        """Replace the whole task collection."""
+        raise NotImplementedError
+
+    def snapshot(self) -> TaskSnapshot:
+        """Return the current immutable snapshot of all tasks."""
+        raise NotImplementedError
+
+    def patch(self, task_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Set some fields of a stored task, leaving the others untouched.
+
+        Args:
+            task_id: ID of the task to change
+            changes: Fields to set
+
+        Returns:
+            The updated task, or None if not found
+        """
+        with self.batch():
+            task = self.get(task_id)
+            if task is None:
+                return None
+            task.update(changes)
+            self.update(task)
+            return task
+
+    @contextmanager
+    def batch(self):
+        """Group several mutations so they are persisted together.
+
+        Backends that can defer writes do so until the outermost batch
+        exits; the default just runs the mutations one by one.
+        """
+        yield self
+
+    def find(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Get tasks whose fields equal all of the given values.
+
+        Args:
+            criteria: Dictionary of fields to match
+
+        Returns:
+            List of matching tasks in insertion order
+        """
+        result = []
+        for task in self.all():
+            if all(key in task and task[key] == value for key, value in criteria.items()):
+                result.append(task)
+        return result
+
+    def count(self, criteria: Dict[str, Any]) -> int:
+        """Return the number of tasks matching the criteria."""
+        return len(self.find(criteria))
+
+    def find_recurring(self, include_completed: bool = True) -> List[Dict[str, Any]]:
+        """Get the tasks that have a recurrence rule, in insertion order."""
+        return [task for task in self.all()
+                if is_recurring(task) and (include_completed or not task.get('completed', False))]
+
+    def find_recent(self, limit: int, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get the most recently created tasks, newest first.
+
+        Args:
+            limit: Maximum number of tasks
+            before: Only tasks created before the task with this ID (a
+                pagination cursor); a deleted task's sortable ID still works
+
+        Returns:
+            List of tasks, newest first
+        """
+        tasks = sorted((task for task in self.all() if 'id' in task), key=creation_key, reverse=True)
+        if before is not None:
+            cursor = next((task for task in tasks if task['id'] == before), None)
+            if cursor is not None:
+                cursor_key = creation_key(cursor)
+            elif is_sortable_id(before):
+                cursor_key = before
+            else:
+                return []
+            tasks = [task for task in tasks if creation_key(task) < cursor_key]
+        return tasks[:max(0, limit)]
+
+    def find_by_date_range(self, start: Optional[datetime], end: Optional[datetime],
+                           include_completed: bool = True) -> List[Dict[str, Any]]:
+        """
+        Get dated tasks with start <= date < end, sorted by date.
+
+        Args:
+            start: Inclusive lower bound, or None for no bound
+            end: Exclusive upper bound, or None for no bound
+            include_completed: Whether completed tasks are returned
+
+        Returns:
+            List of matching tasks, oldest first
+        """
+        start_ts = to_timestamp(start) if start else None
+        end_ts = to_timestamp(end) if end else None
+        result = []
+
+        for task in self.all():
+            if not include_completed and task.get('completed', False):
+                continue
+            ts = task_timestamp(task)
+            if ts is None:
+                continue
+            if (start_ts is None or ts >= start_ts) and (end_ts is None or ts < end_ts):
+                result.append((ts, task))
+
+        result.sort(key=lambda item: item[0])
+        return [task for _, task in result]
+
+
+class JSONTaskStore(TaskStore):
+    """In-memory task store backed by a JSON file.
+
+    The file is parsed once and all reads are served from memory. Every
+    mutation is written straight through to disk. If the file is changed
+    by someone else (detected via inode, mtime and size) it is reloaded
+    on the next access.
+
+    Writes are safe across processes: every mutation re-reads the file if
+    needed and writes it under an exclusive lock on ``<tasks_file>.lock``,
+    and files are replaced atomically so readers never see partial writes.
+    Concurrent writers in one process are group-committed: while one
+    thread holds the lock, the others queue up and the next leader applies
+    the whole queue with a single write.
+
+    Tasks are held as compact Task records (converted to dicts only when
+    returned) in an insertion-ordered dict keyed by ID, so point lookups
+    and mutations cost O(1) regardless of how many tasks exist.
+    A sorted (timestamp, seq, key) list indexes dated tasks, so date range
+    queries are a bisect plus a walk over the matching slice. A sorted
+    (creation_key, key) list orders tasks by creation; new sortable IDs
+    always sort last, so adding a task appends to it. Inverted
+    indexes (value -> set of keys) on the commonly filtered fields let
+    criteria queries intersect sets instead of scanning every task.
+    """
+
+    # Fields with an inverted index
+    INDEXED_FIELDS = ('type', 'priority', 'category', 'completed', 'source')
+
+    def __init__(self, tasks_file: str = "tasks.json"):
+        """Initialize the store and load the tasks file."""
+        self.tasks_file = tasks_file
+        self._lock = threading.RLock()
+        self._tasks: Dict[Any, Task] = {}
+        self._anonymous_keys = itertools.count()
+        self._date_index: List[Tuple[float, int, Any]] = []
+        self._date_entries: Dict[Any, Tuple[float, int, Any]] = {}
+        self._creation_index: List[Tuple[str, Any]] = []
+        self._creation_entries: Dict[Any, Tuple[str, Any]] = {}
+        self._positions: Dict[Any, int] = {}
+        self._field_index: Dict[str, Dict[Any, set]] = {}
+        self._sequence = itertools.count()
+        self._batch_depth = 0
+        self._batch_owner = None
+        self._batch_dirty = False
+        self._pending_records: List[Dict[str, Any]] = []
+        self._version = 0
+        self._epoch = uuid.uuid4().hex[:8]
+        self._snapshot: Optional[TaskSnapshot] = None
+        self._base: Optional[_SnapshotBase] = None
+        self._changes: Dict[Any, Tuple[Optional[Task], int]] = {}
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._file_lock = FileLock(tasks_file + ".lock")
+        self._commit_lock = threading.Lock()
+        self._commit_queue: List[Dict[str, Any]] = []
+        self._queue_lock = threading.Lock()
+
+        # Ensure tasks file exists
+        with self._file_lock:
+            if not os.path.exists(tasks_file):
+                _write_json_atomic(tasks_file, [])
+            self._load()
+            self._publish()
+
+    def _file_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Return (inode, mtime, size) of the tasks file, or None if missing."""
+        try:
+            st = os.stat(self.tasks_file)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        """(Re)load the tasks file into memory."""
+        self._signature = self._file_signature()
+        self._reset()
+        if not os.path.exists(self.tasks_file):
+            return
+
+        try:
+            with open(self.tasks_file, "r") as f:
+                tasks = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Error decoding {self.tasks_file}, returning empty list")
+            return
+
+        for task in tasks:
+            self._put(Task.from_dict(task))
+
+    def _refresh(self):
+        """Reload the file if it was modified outside this store."""
+        # Inside a batch memory is ahead of disk; reloading would drop it
+        if self._batch_depth == 0 and self._file_signature() != self._signature:
+            self._load()
+            self._publish()
+
+    def _publish(self):
+        """Publish a new snapshot of the current in-memory state."""
+        self._version += 1
+        if self._base is None or _rebase_due(self._changes, len(self._tasks)):
+            # Copy the containers into a new shared base; the Task records
+            # themselves are immutable
+            self._base = _SnapshotBase(dict(self._tasks), dict(self._positions), list(self._date_index),
+                                       list(self._creation_index))
+            self._changes = {}
+        self._snapshot = TaskSnapshot(self._version, self._epoch, self._base, dict(self._changes))
+
+    def snapshot(self) -> TaskSnapshot:
+        """
+        Return the current snapshot without taking the store lock.
+
+        Returns:
+            Latest published TaskSnapshot
+        """
+        snapshot = self._snapshot
+        if self._batch_depth == 0 and self._file_signature() != self._signature:
+            # Changed by another process; reload once under the lock
+            with self._lock:
+                self._refresh()
+                snapshot = self._snapshot
+        return snapshot
+
+    def _flush(self):
+        """Write the in-memory tasks back to disk (caller holds the file lock)."""
+        _write_json_atomic(self.tasks_file, [task.to_dict() for task in self._tasks.values()])
+        self._signature = self._file_signature()
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        """Persist mutation records (see _apply_record) that are already in memory."""
+        self._flush()
+
+    def _commit(self, mutation: Callable[[], Tuple[Any, Optional[List[Dict[str, Any]]]]]) -> Any:
+        """
+        Apply a mutation to the in-memory tasks and persist it.
+
+        The mutation runs against freshly refreshed state under the file
+        lock and returns (result, records); records of None requests a
+        full rewrite. Mutations queued by other threads while the lock
+        was busy are applied and written together.
+
+        Args:
+            mutation: Callable applying the change in memory
+
+        Returns:
+            The mutation's result
+        """
+        # Inside a batch on this thread: apply now, write when it exits
+        if self._batch_owner == threading.get_ident():
+            result, records = mutation()
+            self._batch_dirty = True
+            if records is None:
+                self._pending_records = []
+                self._flush()
+            else:
+                self._pending_records.extend(records)
+            return result
+
+        entry = {'mutation': mutation, 'done': False, 'result': None, 'error': None}
+        with self._queue_lock:
+            self._commit_queue.append(entry)
+
+        with self._commit_lock:
+            if not entry['done']:
+                # This thread is the leader: commit everything queued so far
+                with self._queue_lock:
+                    group, self._commit_queue = self._commit_queue, []
+                with self._lock, self._file_lock:
+                    self._refresh()
+                    full_write = False
+                    records = []
+                    for queued in group:
+                        try:
+                            queued['result'], queued_records = queued['mutation']()
+                            if queued_records is None:
+                                full_write = True
+                            else:
+                                records.extend(queued_records)
+                        except Exception as e:
+                            queued['error'] = e
+                    try:
+                        if full_write:
+                            self._flush()
+                        elif records:
+                            self._write_records(records)
+                    except Exception as e:
+                        # Memory is now ahead of disk; resync from the file
+                        self._load()
+                        for queued in group:
+                            queued['error'] = queued['error'] or e
+                    self._publish()
+                    for queued in group:
+                        queued['done'] = True
+
+        if entry['error'] is not None:
+            raise entry['error']
+        return entry['result']
+
+    @contextmanager
+    def batch(self):
+        """Hold the locks and defer persistence until the outermost batch exits, then write once."""
+        with self._lock, self._file_lock:
+            if self._batch_depth == 0:
+                self._refresh()
+                self._batch_owner = threading.get_ident()
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._batch_owner = None
+                    if self._pending_records:
+                        records, self._pending_records = self._pending_records, []
+                        self._write_records(records)
+                    if self._batch_dirty:
+                        # Readers see the whole batch at once
+                        self._batch_dirty = False
+                        self._publish()
+
+    def _apply_record(self, record: Dict[str, Any]):
+        """Apply a 'put' (upsert) or 'delete' record to the in-memory tasks."""
+        if record['op'] == 'put':
+            self._put(Task.from_dict(record['task']))
+        elif record['op'] == 'delete':
+            self._remove(record['id'])
+
+    def _reset(self):
+        """Drop all in-memory tasks and indexes."""
+        self._tasks = {}
+        self._date_index = []
+        self._date_entries = {}
+        self._creation_index = []
+        self._creation_entries = {}
+        self._positions = {}
+        self._field_index = {field: {} for field in self.INDEXED_FIELDS}
+        # The next snapshot needs a new base
+        self._base = None
+        self._changes = {}
+
+    def _put(self, task: Task):
+        """Insert or replace a task in memory, keeping its position on replace."""
+        # Tasks without an ID (hand-edited files) get a private key so they
+        # are kept and written back, but can never be looked up by ID
+        key = task['id'] if 'id' in task else ('__noid__', next(self._anonymous_keys))
+        self._unindex(key)
+        self._tasks[key] = task
+        if key not in self._positions:
+            # Insertion sequence number; matches the dict's iteration order
+            self._positions[key] = next(self._sequence)
+
+        ts = task.date_ts
+        if ts is not None:
+            # Ties sort by insertion order; the unique sequence number also
+            # keeps keys from ever being compared
+            entry = (ts, self._positions[key], key)
+            bisect.insort(self._date_index, entry)
+            self._date_entries[key] = entry
+
+        if 'id' in task:
+            entry = (creation_key(task), key)
+            if self._creation_entries.get(key) != entry:
+                self._uncreate(key)
+                if not self._creation_index or entry > self._creation_index[-1]:
+                    self._creation_index.append(entry)
+                else:
+                    # Legacy ID, or a task whose created_at was edited
+                    bisect.insort(self._creation_index, entry)
+                self._creation_entries[key] = entry
+
+        for field in self.INDEXED_FIELDS:
+            if field in task and _is_hashable(task.get(field)):
+                self._field_index[field].setdefault(task.get(field), set()).add(key)
+
+        if self._base is not None:
+            self._changes[key] = (task, self._positions[key])
+
+    def _remove(self, task_id: str) -> Optional[Task]:
+        """Remove a task from memory and return it, or None if not found."""
+        self._unindex(task_id)
+        self._uncreate(task_id)
+        self._positions.pop(task_id, None)
+        task = self._tasks.pop(task_id, None)
+        if task is not None and self._base is not None:
+            self._changes[task_id] = (None, -1)
+        return task
+
+    def _uncreate(self, key: Any):
+        """Remove a task's entry from the creation index."""
+        entry = self._creation_entries.pop(key, None)
+        if entry is not None:
+            del self._creation_index[bisect.bisect_left(self._creation_index, entry)]
+
+    def _unindex(self, key: Any):
+        """Remove a task's entries from the secondary indexes."""
+        entry = self._date_entries.pop(key, None)
+        if entry is not None:
+            del self._date_index[bisect.bisect_left(self._date_index, entry)]
+
+        task = self._tasks.get(key)
+        if task is None:
+            return
+        for field in self.INDEXED_FIELDS:
+            value = task.get(field)
+            if field in task and _is_hashable(value):
+                keys = self._field_index[field].get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._field_index[field][value]
+
+    def all(self) -> List[Dict[str, Any]]:
+        """
+        Get all tasks.
+
+        Returns:
+            List of task dictionaries (copies, safe to modify)
+        """
+        with self._lock:
+            self._refresh()
+            return [task.to_dict() for task in self._tasks.values()]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a task by ID.
+
+        Args:
+            task_id: ID of the task to retrieve
+
+        Returns:
+            Copy of the task dictionary or None if not found
+        """
+        with self._lock:
+            self._refresh()
+            task = self._tasks.get(task_id)
+            return task.to_dict() if task is not None else None
+
+    def _match_keys(self, criteria: Dict[str, Any]) -> List[Any]:
+        """Return the keys of tasks matching the criteria, in insertion order."""
+        if 'id' in criteria and _is_hashable(criteria['id']):
+            candidates = [criteria['id']] if criteria['id'] in self._tasks else []
+        else:
+            index_sets = [self._field_index[key].get(value, set())
+                          for key, value in criteria.items()
+                          if key in self._field_index and _is_hashable(value)]
+            if not index_sets:
+                candidates = list(self._tasks)
+            else:
+                # Walk the smallest set and probe the others
+                index_sets.sort(key=len)
+                smallest, others = index_sets[0], index_sets[1:]
+                candidates = [key for key in smallest if all(key in keys for keys in others)]
+                candidates.sort(key=self._positions.__getitem__)
+
+        # Check every criterion on the (small) candidate list; this also
+        # covers fields without an index
+        return [key for key in candidates if self._tasks[key].matches(criteria)]
+
+    def find(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get tasks matching criteria by intersecting the inverted indexes."""
+        with self._lock:
+            self._refresh()
+            return [self._tasks[key].to_dict() for key in self._match_keys(criteria)]
+
+    def count(self, criteria: Dict[str, Any]) -> int:
+        """Return the number of matching tasks without copying them."""
+        with self._lock:
+            self._refresh()
+            return len(self._match_keys(criteria))
+
+    def find_recurring(self, include_completed: bool = True) -> List[Task]:
+        """Get the recurring tasks as read-only records, from the current snapshot's cached list."""
+        return self.snapshot().find_recurring(include_completed)
+
+    def find_recent(self, limit: int, before: Optional[str] = None) -> List[Task]:
+        """Get the newest tasks as read-only records, from the current snapshot's creation index."""
+        return self.snapshot().find_recent(limit, before)
+
+    def find_by_date_range(self, start: Optional[datetime], end: Optional[datetime],
+                           include_completed: bool = True) -> List[Dict[str, Any]]:
+        """Get dated tasks with start <= date < end, sorted by date, via the date index."""
+        with self._lock:
+            self._refresh()
+            # (ts,) sorts before every (ts, seq, key) entry with the same ts
+            lo = bisect.bisect_left(self._date_index, (to_timestamp(start),)) if start else 0
+            hi = bisect.bisect_left(self._date_index, (to_timestamp(end),)) if end else len(self._date_index)
+
+            result = []
+            for _, _, key in self._date_index[lo:hi]:
+                task = self._tasks[key]
+                if include_completed or not task.get('completed', False):
+                    result.append(task.to_dict())
+            return result
+
+    def add(self, task: Dict[str, Any]):
+        """Append a task and persist."""
+        task = dict(task)
+
+        def mutation():
+            self._put(Task.from_dict(task))
+            return None, [{'op': 'put', 'task': task}]
+
+        self._commit(mutation)
+
+    def update(self, task: Dict[str, Any]) -> bool:
+        """
+        Replace the stored task with the same ID and persist.
+
+        Returns:
+            Boolean indicating whether the task was found
+        """
+        task = dict(task)
+
+        def mutation():
+            if task['id'] not in self._tasks:
+                return False, []
+            self._put(Task.from_dict(task))
+            return True, [{'op': 'put', 'task': task}]
+
+        return self._commit(mutation)
+
+    def patch(self, task_id: str, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Set some fields of a stored task atomically (see TaskStore.patch)."""
+        def mutation():
+            if task_id not in self._tasks:
+                return None, []
+            task = dict(self._tasks[task_id].to_dict(), **changes)
+            self._put(Task.from_dict(task))
+            return dict(task), [{'op': 'put', 'task': task}]
+
+        return self._commit(mutation)
+
+    def delete(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove a task and persist.
+
+        Returns:
+            The removed task or None if not found
+        """
+        def mutation():
+            removed = self._remove(task_id)
+            if removed is None:
+                return None, []
+            return removed.to_dict(), [{'op': 'delete', 'id': task_id}]
+
+        return self._commit(mutation)
+
+    def replace_all(self, tasks: List[Dict[str, Any]]):
+        """Replace the whole task list and persist."""
+        tasks = [Task.from_dict(task) for task in tasks]
+
+        def mutation():
+            self._reset()
+            for task in tasks:
+                self._put(task)
+            return None, None
+
+        self._commit(mutation)
+
+
+class JournaledTaskStore(JSONTaskStore):
+    """Task store that appends mutations to a journal instead of rewriting.
+
+    The tasks file acts as a snapshot. Each add/update/delete is appended
+    as one JSON line to ``<tasks_file>.journal``; on load the snapshot is
+    read and the journal replayed on top of it. Once the journal grows
+    past ``compact_threshold`` bytes a background thread folds it into a
+    fresh snapshot. Records are upserts/deletes by ID, so replaying a
+    journal over a snapshot that already contains it is harmless.
+    """
+
+    def __init__(self, tasks_file: str = "tasks.json", compact_threshold: int = 1024 * 1024):
+        """Initialize the store, replaying any existing journal."""
+        self.journal_file = tasks_file + ".journal"
+        self.compact_threshold = compact_threshold
+        self._compacting = False
+        super().__init__(tasks_file)
+
+    def _file_signature(self):
+        """Return the combined signature of the snapshot and the journal."""
+        snapshot = super()._file_signature()
+        try:
+            st = os.stat(self.journal_file)
+            journal = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            journal = None
+        return (snapshot, journal)
+
+    def _load(self):
+        """Load the snapshot and replay the journal on top of it."""
+        super()._load()
+        if not os.path.exists(self.journal_file):
+            return
+
+        with open(self.journal_file, "r") as f:
+            for line in f:
+                try:
+                    self._apply_record(json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    # Torn write at the end of the journal; ignore it
+                    continue
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        """Append mutation records to the journal in a single write."""
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with open(self.journal_file, "a+b") as f:
+            # Writers hold the file lock, so a missing final newline is a torn
+            # write from a crash; start on a fresh line so it can't swallow ours
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+        self._signature = self._file_signature()
+
+        if self._signature[1][2] >= self.compact_threshold and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    def _flush(self):
+        """Write a full snapshot and start a new, empty journal (caller holds the file lock)."""
+        _write_json_atomic(self.tasks_file, [task.to_dict() for task in self._tasks.values()])
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._signature = self._file_signature()
+
+    def _compact(self):
+        """Fold the journal into a new snapshot without blocking writers."""
+        try:
+            with self._lock, self._file_lock:
+                self._refresh()
+                tasks = list(self._tasks.values())
+                snapshot_sig, journal_sig = self._file_signature()
+                if journal_sig is None:
+                    # A full write already folded the journal in
+                    return
+                offset = journal_sig[2]
+
+            # Serialize outside the lock; writers keep appending meanwhile
+            tmp_file = f"{self.tasks_file}.{os.getpid()}.compact"
+            with open(tmp_file, "w") as f:
+                json.dump([task.to_dict() for task in tasks], f, indent=2)
+
+            with self._lock, self._file_lock:
+                current_snapshot, current_journal = self._file_signature()
+                if current_snapshot != snapshot_sig or current_journal is None \
+                        or current_journal[0] != journal_sig[0]:
+                    # Snapshot was rewritten meanwhile; this compaction is stale
+                    os.remove(tmp_file)
+                    return
+
+                # Carry over records appended while the snapshot was written
+                with open(self.journal_file, "r") as f:
+                    f.seek(offset)
+                    tail = f.read()
+                os.replace(tmp_file, self.tasks_file)
+                _write_text_atomic(self.journal_file, tail)
+                if tail:
+                    # Memory may be missing records another process appended
+                    # meanwhile; adopting the new files as-is would hide them
+                    self._load()
+                    self._publish()
+                else:
+                    self._signature = self._file_signature()
+        except Exception as e:
+            print(f"Error compacting {self.journal_file}: {str(e)}")
+        finally:
+            self._compacting = False
+
+
+def _is_hashable(value: Any) -> bool:
+    """Return True if the value can be used as an index key."""
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _write_text_atomic(path: str, text: str):
+    """Write text to a temporary file and rename it over the target."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _write_json_atomic(path: str, data: Any):
+    """Write JSON to a temporary file and rename it over the target."""
+    _write_text_atomic(path, json.dumps(data, indent=2))
+
+
+class SQLiteTaskStore(TaskStore):
+    """Task store backed by a SQLite database.
+
+    The full task is kept as JSON in the ``data`` column. The fields used
+    for filtering are copied into indexed columns so that criteria and
+    date range queries run as index lookups instead of Python scans.
+
+    Triggers log the ID of every changed task in ``task_changes``, so a
+    snapshot is brought up to date by decoding only the tasks changed
+    since the previous one, by this or any other process.
+    """
+
+    # Most recent change log entries kept; a store that falls further
+    # behind rebuilds its snapshot from the full table
+    CHANGE_LOG_SIZE = 10000
+
+    # Task fields mirrored into indexed columns, with the Python type a
+    # criteria value must have to be answered by SQL
+    INDEXED_FIELDS = {
+        'completed': bool,
+        'category': str,
+        'priority': str,
+        'type': str,
+        'source': str,
+    }
+
+    def __init__(self, db_file: str = "tasks.db"):
+        """Open (and if needed create) the database."""
+        self.db_file = db_file
+        self._lock = threading.RLock()
+        # Other processes may hold the write lock; wait rather than fail
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._batch_depth = 0
+        self._commits = 0
+        self._version = 0
+        self._epoch = uuid.uuid4().hex[:8]
+        self._snapshot: Optional[TaskSnapshot] = None
+        self._snapshot_key = None
+        self._snapshot_rev = 0
+        self._create_schema()
+
+    def _create_schema(self):
+        """Create the tasks table and its indexes."""
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    date_ts REAL,
+                    completed INTEGER,
+                    category TEXT,
+                    priority TEXT,
+                    type TEXT,
+                    source TEXT,
+                    recurring INTEGER,
+                    created_key TEXT,
+                    data TEXT NOT NULL
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+            if 'recurring' not in columns:
+                # Databases created before the column existed: add and fill it
+                self._conn.execute("ALTER TABLE tasks ADD COLUMN recurring INTEGER")
+                rows = self._conn.execute("SELECT id, data FROM tasks").fetchall()
+                self._conn.executemany(
+                    "UPDATE tasks SET recurring = 1 WHERE id = ?",
+                    [(task_id,) for task_id, data in rows if is_recurring(json.loads(data))])
+            if 'created_key' not in columns:
+                self._conn.execute("ALTER TABLE tasks ADD COLUMN created_key TEXT")
+                rows = self._conn.execute("SELECT id, data FROM tasks").fetchall()
+                self._conn.executemany(
+                    "UPDATE tasks SET created_key = ? WHERE id = ?",
+                    [(creation_key(json.loads(data)), task_id) for task_id, data in rows])
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks(date_ts)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_key)")
+            # Partial index: only the (few) recurring series are indexed
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_tasks_recurring ON tasks(recurring) WHERE recurring = 1")
+            for field in self.INDEXED_FIELDS:
+                self._conn.execute(
+                    f"CREATE INDEX IF NOT EXISTS idx_tasks_{field} ON tasks({field})")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_changes (
+                    rev INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL
+                )
+            """)
+            for event, row in (('INSERT', 'new'), ('UPDATE', 'new'), ('DELETE', 'old')):
+                self._conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS tasks_log_{event.lower()} AFTER {event} ON tasks "
+                    f"BEGIN INSERT INTO task_changes (id) VALUES ({row}.id); END")
+
+    @contextmanager
+    def batch(self):
+        """Run the enclosed mutations in one transaction, committed at the outermost exit."""
+        with self._lock:
+            if self._batch_depth == 0:
+                # Take the write lock up front so read-modify-write is atomic
+                # across processes
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._conn.rollback()
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.execute(
+                    "DELETE FROM task_changes WHERE rev <= (SELECT MAX(rev) FROM task_changes) - ?",
+                    (self.CHANGE_LOG_SIZE,))
+                self._conn.commit()
+                self._commits += 1
+
+    def snapshot(self) -> TaskSnapshot:
+        """
+        Return a snapshot of all tasks, updated only when the data changed.
+
+        Changes by this store are tracked by a commit counter and changes
+        by other connections via ``PRAGMA data_version``. Only the tasks
+        logged in ``task_changes`` since the previous snapshot are read.
+
+        Returns:
+            Latest TaskSnapshot
+        """
+        with self._lock:
+            key = (self._conn.execute("PRAGMA data_version").fetchone()[0], self._commits)
+            if key != self._snapshot_key:
+                # Read the log position first: rows read afterwards may be
+                # newer, and applying them again next time is harmless
+                rev, oldest = self._conn.execute(
+                    "SELECT COALESCE(MAX(rev), 0), MIN(rev) FROM task_changes").fetchone()
+                self._version += 1
+                if self._snapshot is None or (oldest or 0) > self._snapshot_rev + 1:
+                    # First snapshot, or the log was pruned past our position
+                    self._snapshot = self._load_snapshot()
+                else:
+                    self._snapshot = self._update_snapshot(self._snapshot, rev)
+                self._snapshot_key = key
+                self._snapshot_rev = rev
+            return self._snapshot
+
+    def _load_snapshot(self) -> TaskSnapshot:
+        """Build a snapshot from the full table (caller holds the lock)."""
+        tasks, positions, date_index, creation_index = {}, {}, [], []
+        rows = self._conn.execute("SELECT seq, id, created_key, data FROM tasks ORDER BY seq")
+        for seq, task_id, created_key, data in rows:
+            task = Task.from_dict(json.loads(data))
+            tasks[task_id] = task
+            positions[task_id] = seq
+            if task.date_ts is not None:
+                date_index.append((task.date_ts, seq, task_id))
+            creation_index.append((created_key, task_id))
+        date_index.sort()
+        creation_index.sort()
+        base = _SnapshotBase(tasks, positions, date_index, creation_index)
+        return TaskSnapshot(self._version, self._epoch, base, {})
+
+    def _update_snapshot(self, previous: TaskSnapshot, rev: int) -> TaskSnapshot:
+        """Apply the tasks changed up to ``rev`` to the previous snapshot (caller holds the lock)."""
+        changed = [row[0] for row in self._conn.execute(
+            "SELECT DISTINCT id FROM task_changes WHERE rev > ? AND rev <= ?", (self._snapshot_rev, rev))]
+        if len(changed) > len(previous._base.tasks) // 2:
+            # Mostly new data (e.g. replace_all); a full read is cheaper
+            return self._load_snapshot()
+
+        changes = dict(previous._changes)
+        for task_id in changed:
+            changes[task_id] = (None, -1)
+        for i in range(0, len(changed), 500):
+            chunk = changed[i:i + 500]
+            rows = self._conn.execute(
+                f"SELECT seq, id, data FROM tasks WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+            for seq, task_id, data in rows:
+                changes[task_id] = (Task.from_dict(json.loads(data)), seq)
+
+        snapshot = TaskSnapshot(self._version, self._epoch, previous._base, changes)
+        if _rebase_due(changes, len(previous._base.tasks)):
+            snapshot = TaskSnapshot(self._version, self._epoch, snapshot._fold(), {})
+        return snapshot
+
+    def _row_values(self, task: Dict[str, Any]) -> Tuple:
+        """Return the column values for a task, in table column order."""
+        values = [task['id'], task_timestamp(task)]
+        for field, field_type in self.INDEXED_FIELDS.items():
+            value = task.get(field)
+            values.append(value if isinstance(value, field_type) else None)
+        values.append(1 if is_recurring(task) else None)
+        values.append(creation_key(task))
+        values.append(json.dumps(task))
+        return tuple(values)
+
+    def _select(self, where: str = "", params: Tuple = (), order: str = "seq") -> List[Dict[str, Any]]:
+        """Run a SELECT over the tasks table and decode the results."""
+        sql = "SELECT data FROM tasks"
+        if where:
+            sql += " WHERE " + where
+        sql += " ORDER BY " + order
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return all tasks in insertion order."""
+        return self._select()
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return the task with the given ID, or None."""
+        rows = self._select("id = ?", (task_id,))
+        return rows[0] if rows else None
+
+    def add(self, task: Dict[str, Any]):
+        """Insert a new task."""
+        with self.batch():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (id, date_ts, completed, category, priority, type, source, "
+                "recurring, created_key, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self._row_values(task))
+
+    def update(self, task: Dict[str, Any]) -> bool:
+        """Replace the task with the same ID; return False if not found."""
+        values = self._row_values(task)
+        with self.batch():
+            cursor = self._conn.execute(
+                "UPDATE tasks SET date_ts = ?, completed = ?, category = ?, priority = ?, type = ?, "
+                "source = ?, recurring = ?, created_key = ?, data = ? WHERE id = ?",
+                values[1:] + (values[0],))
+        return cursor.rowcount > 0
+
+    def delete(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Remove a task; return it, or None if not found."""
+        with self.batch():
+            task = self.get(task_id)
+            if task is not None:
+                self._conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+        return task
+
+    def replace_all(self, tasks: List[Dict[str, Any]]):
+        """Replace all tasks in a single transaction."""
+        with self.batch():
+            self._conn.execute("DELETE FROM tasks")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks (id, date_ts, completed, category, priority, type, source, "
+                "recurring, created_key, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._row_values(task) for task in tasks if 'id' in task])
+
+    def _criteria_sql(self, criteria: Dict[str, Any]) -> Tuple[str, Tuple, Dict[str, Any]]:
+        """Split criteria into a SQL WHERE clause and those left for Python."""
+        clauses, params, remaining = [], [], {}
+        for key, value in criteria.items():
+            field_type = self.INDEXED_FIELDS.get(key)
+            if field_type is not None and isinstance(value, field_type):
+                clauses.append(f"{key} = ?")
+                params.append(value)
+            elif key == 'id' and isinstance(value, str):
+                clauses.append("id = ?")
+                params.append(value)
+            else:
+                remaining[key] = value
+        return " AND ".join(clauses), tuple(params), remaining
+
+    def find(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get tasks matching criteria, using the indexed columns where possible."""
+        where, params, remaining = self._criteria_sql(criteria)
+        tasks = self._select(where, params)
+        if not remaining:
+            return tasks
+        return [task for task in tasks
+                if all(key in task and task[key] == value for key, value in remaining.items())]
+
+    def count(self, criteria: Dict[str, Any]) -> int:
+        """Return the number of matching tasks, counted in SQL where possible."""
+        where, params, remaining = self._criteria_sql(criteria)
+        if remaining:
+            return len(self.find(criteria))
+        sql = "SELECT COUNT(*) FROM tasks" + (" WHERE " + where if where else "")
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def find_recurring(self, include_completed: bool = True) -> List[Dict[str, Any]]:
+        """Get the recurring tasks via the partial recurring index."""
+        where = "recurring = 1"
+        if not include_completed:
+            where += " AND (completed IS NULL OR completed = 0)"
+        return self._select(where)
+
+    def find_recent(self, limit: int, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get the newest tasks (see TaskStore.find_recent) via the creation index."""
+        where, params = "", ()
+        if before is not None:
+            with self._lock:
+                row = self._conn.execute("SELECT created_key FROM tasks WHERE id = ?", (before,)).fetchone()
+            if row is not None:
+                cursor_key = row[0]
+            elif is_sortable_id(before):
+                cursor_key = before
+            else:
+                return []
+            where, params = "created_key < ?", (cursor_key,)
+        return self._select(where, params, order=f"created_key DESC LIMIT {max(0, int(limit))}")
+
+    def find_by_date_range(self, start: Optional[datetime], end: Optional[datetime],
+                           include_completed: bool = True) -> List[Dict[str, Any]]:
+        """Get dated tasks with start <= date < end via the date index."""
+        clauses, params = ["date_ts IS NOT NULL"], []
+        if start is not None:
+            clauses.append("date_ts >= ?")
+            params.append(to_timestamp(start))
+        if end is not None:
+            clauses.append("date_ts < ?")
+            params.append(to_timestamp(end))
+        if not include_completed:
+            clauses.append("(completed IS NULL OR completed = 0)")
+        return self._select(" AND ".join(clauses), tuple(params), order="date_ts, seq")
+
+
+def migrate_json_to_sqlite(tasks_file: str, db_file: str) -> int:
+    """
+    Copy all tasks from a JSON tasks file into a SQLite database.
+
+    Args:
+        tasks_file: Path to the existing tasks JSON file
+        db_file: Path to the SQLite database to fill
+
+    Returns:
+        Number of tasks migrated
+    """
+    with open(tasks_file, "r") as f:
+        tasks = [task for task in json.load(f) if 'id' in task]
+
+    store = SQLiteTaskStore(db_file)
+    store.replace_all(tasks)
+    return len(tasks)
+
+
+def open_task_store(tasks_file: str = "tasks.json", storage: str = "json") -> TaskStore:
+    """
+    Create the task store for the given storage mode.
+
+    Args:
+        tasks_file: Path to the tasks JSON file (snapshot in journal mode)
+        storage: "json" for full-file writes, "journal" for append-only
+            journaling, "sqlite" for a database next to the tasks file
+
+    Returns:
+        Task store instance
+    """
+    if storage == "journal":
+        return JournaledTaskStore(tasks_file)
+    if storage == "json":
+        return JSONTaskStore(tasks_file)
+    if storage == "sqlite":
+        db_file = os.path.splitext(tasks_file)[0] + ".db"
+        if not os.path.exists(db_file) and os.path.exists(tasks_file):
+            count = migrate_json_to_sqlite(tasks_file, db_file)
+            print(f"Migrated {count} tasks from {tasks_file} to {db_file}")
+        return SQLiteTaskStore(db_file)
+    raise ValueError(f"Unknown task storage mode: {storage}")
+
+
+if __name__ == "__main__":
+    # One-shot migration: python task_store.py tasks.json tasks.db
+    if len(sys.argv) != 3:
+        print("Usage: python task_store.py <tasks.json> <tasks.db>")
+        sys.exit(1)
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"Migrated {count} tasks from {sys.argv[1]} to {sys.argv[2]}")
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from archive import TaskArchive
+
+
+def test_query_yields_rearchived_task_once(tmp_path):
+    archive = TaskArchive(str(tmp_path / "archive"))
+    october = {'id': 'task-1', 'date': '2026-10-01T09:00:00', 'priority': 'low'}
+    november = {'id': 'task-2', 'date': '2026-11-01T09:00:00', 'priority': 'high'}
+    archive.append([october, november])
+    # An interrupted cleanup archives the same task again on its next run
+    archive.append([october])
+
+    assert [task['id'] for task in archive.query()] == ['task-1', 'task-2']
+    assert [task['id'] for task in archive.query(datetime(2026, 10, 1), datetime(2026, 11, 1))] == ['task-1']
+    assert [task['id'] for task in archive.query(criteria={'priority': 'high'})] == ['task-2']
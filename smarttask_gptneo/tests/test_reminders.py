@@ -0,0 +1,160 @@
+import time
+
+import reminders
+from reminders import ReminderDispatcher, ReminderQueue, wall_clock
+from task_model import Task
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+class FlakySender:
+    """Fails the first ``failures`` sends, then delivers."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+        self.sent = []
+
+    def __call__(self, task_ids):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise ConnectionError("SMTP server unavailable")
+        self.sent.extend(task_ids)
+        return []
+
+
+def make_dispatcher(tmp_path, send):
+    queue = ReminderQueue(str(tmp_path / "reminders.db"))
+    offset = [0.0]
+    dispatcher = ReminderDispatcher(send, queue, lead_seconds=0, batch_window=0,
+                                    clock=lambda: wall_clock() + offset[0])
+    return dispatcher, queue, offset
+
+
+def fire_now(dispatcher, offset, seconds):
+    """Move the dispatcher's clock forward and wake it up."""
+    offset[0] += seconds
+    with dispatcher._cond:
+        dispatcher._cond.notify()
+
+
+def test_failed_send_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(reminders, 'REMINDER_RETRY_SECONDS', 0.1)
+    send = FlakySender(failures=1)
+    dispatcher, queue, offset = make_dispatcher(tmp_path, send)
+    dispatcher.start()
+    try:
+        dispatcher.schedule(Task.from_dict({'id': 'task-1', 'date': '2099-01-01T09:00:00'}))
+        fire_now(dispatcher, offset, 10 ** 10)
+
+        assert wait_for(lambda: send.sent == ['task-1'])
+        assert send.attempts == 2
+        row = queue._conn.execute("SELECT state, attempts FROM reminders").fetchone()
+        assert row == ('sent', 1)
+    finally:
+        dispatcher.stop()
+
+
+def test_reminder_is_given_up_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(reminders, 'REMINDER_RETRY_SECONDS', 0.05)
+    send = FlakySender(failures=reminders.REMINDER_MAX_ATTEMPTS)
+    dispatcher, queue, offset = make_dispatcher(tmp_path, send)
+    task = Task.from_dict({'id': 'task-1', 'date': '2099-01-01T09:00:00'})
+    fire_ts = task.date_ts
+    dispatcher.start()
+    try:
+        dispatcher.schedule(task)
+        fire_now(dispatcher, offset, 10 ** 10)
+
+        assert wait_for(lambda: queue._conn.execute("SELECT state FROM reminders").fetchone()[0] == 'failed')
+        assert queue.is_done('task-1', fire_ts)
+        assert send.attempts == reminders.REMINDER_MAX_ATTEMPTS
+        assert send.sent == []
+    finally:
+        dispatcher.stop()
+
+
+def test_pending_retry_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(reminders, 'REMINDER_RETRY_SECONDS', 3600)
+    send = FlakySender(failures=1)
+    dispatcher, queue, offset = make_dispatcher(tmp_path, send)
+    dispatcher.start()
+    dispatcher.schedule(Task.from_dict({'id': 'task-1', 'date': '2099-01-01T09:00:00'}))
+    fire_now(dispatcher, offset, 10 ** 10)
+    assert wait_for(lambda: send.attempts == 1)
+    assert wait_for(lambda: queue.pending() != [])
+    task = Task.from_dict({'id': 'task-1', 'date': '2099-01-01T09:00:00'})
+    assert not queue.is_done('task-1', task.date_ts)
+    dispatcher.stop()
+
+    # A new leader resumes the retry from the queue once its backoff passed
+    restarted = ReminderDispatcher(send, ReminderQueue(queue.db_file), lead_seconds=0, batch_window=0,
+                                   clock=lambda: wall_clock() + offset[0] + 7200)
+    restarted.load()
+    restarted.start()
+    try:
+        assert wait_for(lambda: send.sent == ['task-1'])
+    finally:
+        restarted.stop()
+
+
+class RecordingSender:
+    """Records the task IDs of each send call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, task_ids):
+        self.calls.append(sorted(task_ids))
+        return []
+
+
+def schedule_two(dispatcher):
+    """Schedule reminders 30 s apart; return the first one's fire time."""
+    first = Task.from_dict({'id': 'task-1', 'date': '2099-01-01T09:00:00'})
+    dispatcher.schedule(first)
+    dispatcher.schedule(Task.from_dict({'id': 'task-2', 'date': '2099-01-01T09:00:30'}))
+    return first.date_ts
+
+
+def test_reminders_are_not_sent_early(tmp_path):
+    send = RecordingSender()
+    dispatcher, queue, offset = make_dispatcher(tmp_path, send)
+    dispatcher.batch_window = 0
+    dispatcher.start()
+    try:
+        first_ts = schedule_two(dispatcher)
+        fire_now(dispatcher, offset, first_ts - wall_clock())
+        assert wait_for(lambda: send.calls == [['task-1']])
+        time.sleep(0.2)
+        assert send.calls == [['task-1']]
+
+        fire_now(dispatcher, offset, 30)
+        assert wait_for(lambda: send.calls == [['task-1'], ['task-2']])
+    finally:
+        dispatcher.stop()
+
+
+def test_digest_window_holds_due_reminders(tmp_path):
+    send = RecordingSender()
+    dispatcher, queue, offset = make_dispatcher(tmp_path, send)
+    dispatcher.batch_window = 60
+    dispatcher.start()
+    try:
+        first_ts = schedule_two(dispatcher)
+        fire_now(dispatcher, offset, first_ts - wall_clock())
+        time.sleep(0.2)
+        assert send.calls == []
+
+        fire_now(dispatcher, offset, 30)
+        assert wait_for(lambda: send.calls == [['task-1', 'task-2']])
+    finally:
+        dispatcher.stop()
@@ -0,0 +1,99 @@
+import pytest
+
+pytest.importorskip("schedule")
+pytest.importorskip("googleapiclient")
+
+import google_calendar
+import task_scheduler
+from task_scheduler import TaskScheduler
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """Record calendar calls instead of talking to Google."""
+    calls = []
+
+    def create(task):
+        calls.append(('create', task['id']))
+        return 'event-' + task['id']
+
+    monkeypatch.setattr(task_scheduler, 'create_calendar_event', create)
+    monkeypatch.setattr(google_calendar, 'update_calendar_event',
+                        lambda event_id, task: calls.append(('update', event_id)) or True)
+    monkeypatch.setattr(google_calendar, 'delete_calendar_event',
+                        lambda event_id: calls.append(('delete', event_id)) or True)
+    return calls
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return TaskScheduler(str(tmp_path / "tasks.json"))
+
+
+def add_series(scheduler):
+    return scheduler.add_task({'description': 'Standup', 'date': '2026-10-19T09:00:00',
+                               'priority': 'medium', 'category': 'work', 'recurrence': 'daily'})
+
+
+def test_bulk_create_and_update_sync_calendar(scheduler, calendar):
+    task_id = scheduler.add_task({'description': 'Report', 'date': '2026-10-20T10:00:00',
+                                  'priority': 'high', 'category': 'work'})
+
+    results = scheduler.apply_bulk([
+        {'op': 'create', 'task': {'description': 'Call', 'date': '2026-10-21T10:00:00',
+                                  'priority': 'low', 'category': 'personal'}},
+        {'op': 'update', 'id': task_id, 'task': {'priority': 'low'}},
+    ])
+
+    created_id = results[0]['id']
+    assert [result['status'] for result in results] == ['success', 'success']
+    assert sorted(calendar) == sorted([('create', created_id), ('create', task_id)])
+    assert scheduler.get_task(created_id)['calendar_event_id'] == 'event-' + created_id
+    assert scheduler.get_task(task_id)['calendar_event_id'] == 'event-' + task_id
+
+    # Once linked, later edits update the existing event
+    scheduler.apply_bulk([{'op': 'update', 'id': task_id, 'task': {'priority': 'high'}}])
+    assert calendar[-1] == ('update', 'event-' + task_id)
+
+
+def test_bulk_update_of_occurrence_overrides_it(scheduler, calendar):
+    series_id = add_series(scheduler)
+    occurrence_id = f"{series_id}@2026-10-20T09:00:00"
+
+    results = scheduler.apply_bulk([
+        {'op': 'update', 'id': occurrence_id, 'task': {'location': 'Room 4'}},
+    ])
+
+    assert results[0]['status'] == 'success'
+    overrides = scheduler.get_task(series_id)['recurrence_overrides']
+    assert overrides == {'2026-10-20T09:00:00': {'location': 'Room 4'}}
+    assert 'location' not in scheduler.get_task(series_id)
+    # The series' event covers its occurrences
+    assert calendar == []
+    assert scheduler.edit_task(occurrence_id, {})['location'] == 'Room 4'
+
+
+def test_bulk_delete_of_occurrence_cancels_it(scheduler, calendar):
+    series_id = add_series(scheduler)
+    scheduler.sync_calendar_events([scheduler.get_task(series_id)])
+    occurrence_id = f"{series_id}@2026-10-20T09:00:00"
+
+    results = scheduler.apply_bulk([{'op': 'delete', 'id': occurrence_id}])
+
+    assert results[0]['status'] == 'success'
+    series = scheduler.get_task(series_id)
+    assert series['recurrence_overrides'] == {'2026-10-20T09:00:00': None}
+    assert ('delete', series['calendar_event_id']) not in calendar
+    assert scheduler.delete_tasks([occurrence_id, 'missing']) == [True, False]
+
+
+def test_bulk_delete_removes_calendar_event(scheduler, calendar):
+    task_id = scheduler.add_task({'description': 'Report', 'date': '2026-10-20T10:00:00',
+                                  'priority': 'high', 'category': 'work'})
+    scheduler.sync_calendar_events([scheduler.get_task(task_id)])
+
+    results = scheduler.apply_bulk([{'op': 'delete', 'id': task_id}, {'op': 'delete', 'id': task_id}])
+
+    assert [result['status'] for result in results] == ['success', 'error']
+    assert scheduler.get_task(task_id) is None
+    assert calendar[-1] == ('delete', 'event-' + task_id)